@@ -39,7 +39,12 @@ def get_url():
 def do_run_migrations(connection):
     """This internal helper actually runs the migrations sync-style
     inside the async wrapper."""
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite can only alter columns by recreating the table
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
 
     with context.begin_transaction():
         context.run_migrations()
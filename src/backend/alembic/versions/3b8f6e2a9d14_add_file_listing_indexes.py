@@ -0,0 +1,31 @@
+"""Add file listing indexes
+
+Revision ID: 3b8f6e2a9d14
+Revises: e7a4d2c9f1b8
+Create Date: 2026-10-18 16:42:09.318270
+
+"""
+
+from typing import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3b8f6e2a9d14"
+down_revision: str | Sequence[str] | None = "e7a4d2c9f1b8"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_file_expires_at_id", "file", ["expires_at", "id"], unique=False)
+    op.create_index("ix_file_size_id", "file", ["size", "id"], unique=False)
+    op.drop_index(op.f("ix_file_expires_at"), table_name="file")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f("ix_file_expires_at"), "file", ["expires_at"], unique=False)
+    op.drop_index("ix_file_size_id", table_name="file")
+    op.drop_index("ix_file_expires_at_id", table_name="file")
@@ -0,0 +1,36 @@
+"""Sort files without a size as zero
+
+Revision ID: 5a7d3f1c8e62
+Revises: 3b8f6e2a9d14
+Create Date: 2026-10-18 18:05:41.527093
+
+"""
+
+from typing import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5a7d3f1c8e62"
+down_revision: str | Sequence[str] | None = "3b8f6e2a9d14"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index("ix_file_size_id", table_name="file")
+    op.create_index(
+        "ix_file_size_id",
+        "file",
+        [sa.func.coalesce(sa.column("size"), 0), "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_file_size_id", table_name="file")
+    op.create_index("ix_file_size_id", "file", ["size", "id"], unique=False)
@@ -22,10 +22,14 @@ depends_on: str | Sequence[str] | None = None
 
 def upgrade() -> None:
     """Upgrade schema."""
+    # Only PostgreSQL has uuidv7(), ids are also generated by the app
+    id_default = (
+        sa.text("uuidv7()") if op.get_bind().dialect.name == "postgresql" else None
+    )
     # ### commands auto generated by Alembic - please adjust! ###
     op.create_table(
         "user",
-        sa.Column("id", sa.Uuid(), server_default=sa.text("uuidv7()"), nullable=False),
+        sa.Column("id", sa.Uuid(), server_default=id_default, nullable=False),
         sa.Column("username", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
         sa.Column("email", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
         sa.Column("password_hash", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
@@ -22,20 +22,23 @@ depends_on: str | Sequence[str] | None = None
 def upgrade() -> None:
     """Upgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    op.alter_column(
-        "file", "size", existing_type=sa.INTEGER(), type_=sa.BigInteger(), nullable=True
-    )
+    # Batch mode recreates the table on SQLite, which cannot alter columns
+    with op.batch_alter_table("file") as batch_op:
+        batch_op.alter_column(
+            "size", existing_type=sa.INTEGER(), type_=sa.BigInteger(), nullable=True
+        )
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     """Downgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    op.alter_column(
-        "file",
-        "size",
-        existing_type=sa.BigInteger(),
-        type_=sa.INTEGER(),
-        nullable=False,
-    )
+    # Batch mode recreates the table on SQLite, which cannot alter columns
+    with op.batch_alter_table("file") as batch_op:
+        batch_op.alter_column(
+            "size",
+            existing_type=sa.BigInteger(),
+            type_=sa.INTEGER(),
+            nullable=False,
+        )
     # ### end Alembic commands ###
@@ -0,0 +1,49 @@
+"""Add file expiry indexes
+
+Revision ID: 9c3e5b1d7a42
+Revises: 4f2a9c7e1b30
+Create Date: 2026-10-18 11:03:27.552914
+
+"""
+
+from typing import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9c3e5b1d7a42"
+down_revision: str | Sequence[str] | None = "4f2a9c7e1b30"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "file", sa.Column("exhausted_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    # Files used up before this revision are swept on the next run
+    op.execute(
+        "UPDATE file SET exhausted_at = CURRENT_TIMESTAMP "
+        "WHERE download_count >= expire_after_n_download"
+    )
+    op.create_index(op.f("ix_file_expires_at"), "file", ["expires_at"], unique=False)
+    op.create_index(
+        "ix_file_exhausted_at",
+        "file",
+        ["exhausted_at"],
+        unique=False,
+        postgresql_where=sa.text("exhausted_at IS NOT NULL"),
+        sqlite_where=sa.text("exhausted_at IS NOT NULL"),
+    )
+    op.create_index("ix_file_key", "file", ["key"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_file_key", table_name="file")
+    op.drop_index("ix_file_exhausted_at", table_name="file")
+    op.drop_index(op.f("ix_file_expires_at"), table_name="file")
+    op.drop_column("file", "exhausted_at")
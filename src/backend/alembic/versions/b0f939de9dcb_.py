@@ -23,16 +23,20 @@ depends_on: str | Sequence[str] | None = None
 def upgrade() -> None:
     """Upgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    op.add_column(
-        "file", sa.Column("key", sqlmodel.sql.sqltypes.AutoString(), nullable=False)
-    )
-    op.create_unique_constraint(None, "file", ["id", "key"])
+    # Batch mode recreates the table on SQLite, which cannot add constraints.
+    # The name is the one PostgreSQL gives an unnamed constraint.
+    with op.batch_alter_table("file") as batch_op:
+        batch_op.add_column(
+            sa.Column("key", sqlmodel.sql.sqltypes.AutoString(), nullable=False)
+        )
+        batch_op.create_unique_constraint("file_id_key_key", ["id", "key"])
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     """Downgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_constraint(None, "file", type_="unique")
-    op.drop_column("file", "key")
+    with op.batch_alter_table("file") as batch_op:
+        batch_op.drop_constraint("file_id_key_key", type_="unique")
+        batch_op.drop_column("key")
     # ### end Alembic commands ###
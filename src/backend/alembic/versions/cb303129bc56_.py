@@ -10,10 +10,10 @@ from typing import Sequence
 
 import sqlalchemy as sa
 import sqlmodel.sql.sqltypes
-from sqlalchemy.dialects import postgresql
 
 from alembic import op
 from app.models import Config
+from app.models.types import IntegerList, StringList
 
 # revision identifiers, used by Alembic.
 revision: str = "cb303129bc56"
@@ -23,10 +23,14 @@ depends_on: str | Sequence[str] | None = None
 
 
 def upgrade() -> None:
+    # Only PostgreSQL has uuidv7(), ids are also generated by the app
+    id_default = (
+        sa.text("uuidv7()") if op.get_bind().dialect.name == "postgresql" else None
+    )
     # 1. Create Config Table
     op.create_table(
         "config",
-        sa.Column("id", sa.Uuid(), server_default=sa.text("uuidv7()"), nullable=False),
+        sa.Column("id", sa.Uuid(), server_default=id_default, nullable=False),
         sa.Column("total_storage_limit", sa.BigInteger(), nullable=True),
         sa.Column("max_file_size_limit", sa.BigInteger(), nullable=True),
         sa.Column("default_expiry", sa.Integer(), nullable=False),
@@ -34,17 +38,18 @@ def upgrade() -> None:
         sa.Column(
             "site_description", sqlmodel.sql.sqltypes.AutoString(), nullable=False
         ),
-        sa.Column("download_configs", postgresql.ARRAY(sa.Integer()), nullable=True),
-        sa.Column("time_configs", postgresql.ARRAY(sa.Integer()), nullable=True),
-        sa.Column("allowed_file_types", postgresql.ARRAY(sa.String()), nullable=True),
-        sa.Column("banned_file_types", postgresql.ARRAY(sa.String()), nullable=True),
+        # JSON lists on SQLite
+        sa.Column("download_configs", IntegerList(), nullable=True),
+        sa.Column("time_configs", IntegerList(), nullable=True),
+        sa.Column("allowed_file_types", StringList(), nullable=True),
+        sa.Column("banned_file_types", StringList(), nullable=True),
         sa.PrimaryKeyConstraint("id"),
     )
 
     # 2. Create File Table
     op.create_table(
         "file",
-        sa.Column("id", sa.Uuid(), server_default=sa.text("uuidv7()"), nullable=False),
+        sa.Column("id", sa.Uuid(), server_default=id_default, nullable=False),
         sa.Column("filename", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
         sa.Column("expires_at", sa.DateTime(), nullable=False),
         sa.Column("expire_after_n_download", sa.Integer(), nullable=False),
@@ -60,8 +65,10 @@ def upgrade() -> None:
 
     # 3. Seed Initial Data
     config_instance = Config()
-    data = config_instance.model_dump(exclude={"id"})
-    op.bulk_insert(sa.table("config", *[sa.column(k) for k in data.keys()]), [data])
+    data = config_instance.model_dump()
+    # Typed columns, so the lists are encoded for the JSON columns on SQLite
+    columns = [sa.column(k, Config.__table__.c[k].type) for k in data.keys()]
+    op.bulk_insert(sa.table("config", *columns), [data])
 
 
 def downgrade() -> None:
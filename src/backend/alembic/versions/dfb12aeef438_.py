@@ -23,26 +23,28 @@ depends_on: str | Sequence[str] | None = None
 def upgrade() -> None:
     """Upgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    op.alter_column(
-        "file",
-        "created_at",
-        existing_type=postgresql.TIMESTAMP(timezone=True),
-        type_=sa.DateTime(),
-        existing_nullable=False,
-        existing_server_default=sa.text("CURRENT_TIMESTAMP"),
-    )
+    # Batch mode recreates the table on SQLite, which cannot alter columns
+    with op.batch_alter_table("file") as batch_op:
+        batch_op.alter_column(
+            "created_at",
+            existing_type=postgresql.TIMESTAMP(timezone=True),
+            type_=sa.DateTime(),
+            existing_nullable=False,
+            existing_server_default=sa.text("CURRENT_TIMESTAMP"),
+        )
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     """Downgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    op.alter_column(
-        "file",
-        "created_at",
-        existing_type=sa.DateTime(),
-        type_=postgresql.TIMESTAMP(timezone=True),
-        existing_nullable=False,
-        existing_server_default=sa.text("CURRENT_TIMESTAMP"),
-    )
+    # Batch mode recreates the table on SQLite, which cannot alter columns
+    with op.batch_alter_table("file") as batch_op:
+        batch_op.alter_column(
+            "created_at",
+            existing_type=sa.DateTime(),
+            type_=postgresql.TIMESTAMP(timezone=True),
+            existing_nullable=False,
+            existing_server_default=sa.text("CURRENT_TIMESTAMP"),
+        )
     # ### end Alembic commands ###
@@ -0,0 +1,45 @@
+import redis.asyncio as redis
+from redis.asyncio import Redis
+
+from app.settings import settings
+
+_client: Redis | None = None
+
+
+def get_redis_client() -> Redis:
+    """
+    Return the process-wide Redis client, creating it on first use.
+
+    Commands borrow a connection from the client's pool and hand it back, so
+    requests and tasks reuse open connections instead of dialing Redis each
+    time. No connection is made until the first command.
+    """
+    global _client
+
+    if _client is None:
+        # Waits for a free connection instead of failing when all are in use
+        pool = redis.BlockingConnectionPool.from_url(
+            settings.REDIS_ENDPOINT,
+            encoding="utf-8",
+            decode_responses=True,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        _client = Redis.from_pool(pool)
+    return _client
+
+
+async def close_redis_client() -> None:
+    global _client
+
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+def forget_redis_client() -> None:
+    """Drop a client inherited from a parent process without closing it."""
+    global _client
+
+    _client = None
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+
+from fastapi.encoders import jsonable_encoder
+from redis.asyncio import Redis
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.config import Config
+from app.settings import settings
+
+# Bumped on every change so other workers drop their copy
+CONFIG_VERSION_KEY = "config:version"
+
+
+@dataclass(frozen=True)
+class CachedConfig:
+    config: Config
+    version: int
+    # Pre-serialized response body and its validator for `GET /config`
+    body: bytes
+    etag: str
+
+
+_cached: CachedConfig | None = None
+_checked_at = 0.0
+
+
+async def get_cached_config(
+    session: AsyncSession, redis_client: Redis
+) -> CachedConfig | None:
+    """
+    Return the singleton config without touching the database on hot paths.
+
+    The version in Redis is checked at most every CONFIG_CACHE_CHECK_INTERVAL
+    seconds and the row is only reloaded when it moved.
+    """
+    global _cached, _checked_at
+
+    now = time.monotonic()
+    if _cached is not None and now - _checked_at < settings.CONFIG_CACHE_CHECK_INTERVAL:
+        return _cached
+
+    version = int(await redis_client.get(CONFIG_VERSION_KEY) or 0)
+    _checked_at = now
+    if _cached is not None and _cached.version == version:
+        return _cached
+
+    result = await session.exec(select(Config))
+    config = result.first()
+    if not config:
+        return None
+
+    body = json.dumps(jsonable_encoder(config), separators=(",", ":")).encode()
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    _cached = CachedConfig(config=config, version=version, body=body, etag=etag)
+    return _cached
+
+
+async def invalidate_config(redis_client: Redis) -> None:
+    """Drop the cached config here and in every other worker."""
+    global _cached
+
+    _cached = None
+    await redis_client.incr(CONFIG_VERSION_KEY)
@@ -0,0 +1,51 @@
+from redis.asyncio import Redis
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.files import File, FileCacheEntry
+from app.settings import settings
+
+# Remembers keys without a row so bad links do not reach the database
+MISSING = "missing"
+
+
+def _cache_key(key: str) -> str:
+    return f"file:{key}"
+
+
+async def cache_file(redis_client: Redis, file_record: File) -> None:
+    """Write the current state of a row through to the cache."""
+    entry = FileCacheEntry.model_validate(file_record, from_attributes=True)
+    await redis_client.set(
+        _cache_key(file_record.key),
+        entry.model_dump_json(),
+        ex=settings.FILE_CACHE_TTL,
+    )
+
+
+async def get_file(session: AsyncSession, redis_client: Redis, key: str) -> File | None:
+    """
+    Look a file up by its share key, reading through the Redis cache.
+
+    The returned row is detached from the session and only meant for reading.
+    """
+    cached = await redis_client.get(_cache_key(key))
+    if cached == MISSING:
+        return None
+    if cached is not None:
+        return File(**FileCacheEntry.model_validate_json(cached).model_dump())
+
+    result = await session.exec(select(File).where(File.key == key))
+    file_record = result.one_or_none()
+    if file_record is None:
+        await redis_client.set(
+            _cache_key(key), MISSING, ex=settings.FILE_CACHE_MISSING_TTL
+        )
+    else:
+        await cache_file(redis_client, file_record)
+    return file_record
+
+
+async def invalidate_files(redis_client: Redis, *keys: str) -> None:
+    if keys:
+        await redis_client.delete(*(_cache_key(key) for key in keys))
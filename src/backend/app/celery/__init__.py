@@ -1,10 +1,25 @@
-import asyncio
+import time
 
 from celery import Celery
-from celery.signals import worker_process_init
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_shutdown,
+)
+from opentelemetry import context, propagate, trace
+from opentelemetry.propagators.textmap import Getter
+from opentelemetry.trace import Span, SpanKind, StatusCode
+from prometheus_client import start_http_server
 
-from app.db import engine
+from app.cache.client import forget_redis_client
+from app.db import reset_engine
+from app.metrics.registry import TASK_DURATION
 from app.settings import settings
+from app.storage.client import forget_s3_client
+from app.tracing.provider import configure_tracing, get_tracer, shutdown_tracing
 
 celery = Celery(__name__)
 celery.conf.broker_url = settings.CELERY_BROKER_URL
@@ -15,14 +30,135 @@ celery.autodiscover_tasks(["app.tasks"])
 
 @celery.on_after_configure.connect
 def setup_periodic_tasks(sender: Celery, **kwargs):
-    # from celery.schedules import crontab
     # https://docs.celeryq.dev/en/main/userguide/periodic-tasks.html#entries
-    ...
+    from app.tasks import (
+        expire_direct_uploads,
+        expire_resumable_uploads,
+        reap_orphaned_storage,
+        reconcile_storage_usage,
+        sweep_expired_files,
+    )
 
+    sender.add_periodic_task(
+        settings.FILE_SWEEP_INTERVAL,
+        sweep_expired_files.s(),
+        name="sweep expired files",
+    )
+    sender.add_periodic_task(
+        settings.STORAGE_RECONCILE_INTERVAL,
+        reconcile_storage_usage.s(),
+        name="reconcile storage usage",
+    )
+    sender.add_periodic_task(
+        settings.DIRECT_UPLOAD_SWEEP_INTERVAL,
+        expire_direct_uploads.s(),
+        name="expire direct uploads",
+    )
+    sender.add_periodic_task(
+        settings.RESUMABLE_UPLOAD_SWEEP_INTERVAL,
+        expire_resumable_uploads.s(),
+        name="expire resumable uploads",
+    )
+    sender.add_periodic_task(
+        settings.STORAGE_ORPHAN_SWEEP_INTERVAL,
+        reap_orphaned_storage.s(),
+        name="reap orphaned storage",
+    )
 
+
+@worker_init.connect
 @worker_process_init.connect
 def reset_engine_on_fork(*args, **kwargs):
-    asyncio.run(engine.dispose())
+    # Also runs in the main process, the asyncio pool runs tasks there and
+    # never forks. Workers get their own, smaller pool than the web app.
+    reset_engine(settings.CELERY_DB_POOL_SIZE, settings.CELERY_DB_MAX_OVERFLOW)
+    # Each worker process opens its own pooled clients on first use
+    forget_s3_client()
+    forget_redis_client()
+
+
+@worker_init.connect
+def start_metrics_server(*args, **kwargs):
+    if settings.METRICS_ENABLED and settings.CELERY_METRICS_PORT:
+        start_http_server(settings.CELERY_METRICS_PORT)
+
+
+# Start times of running tasks, by task id
+_task_started_at: dict[str, float] = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id: str, *args, **kwargs):
+    _task_started_at[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task_duration(task_id: str, task, state: str | None = None, **kwargs):
+    started_at = _task_started_at.pop(task_id, None)
+    if started_at is not None:
+        TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - started_at
+        )
+
+
+@worker_init.connect
+def start_tracing(*args, **kwargs):
+    configure_tracing("chithi-celery")
+
+
+@worker_shutdown.connect
+def stop_tracing(*args, **kwargs):
+    shutdown_tracing()
+
+
+class _TaskRequestGetter(Getter):
+    """Read the trace context from the headers a task was published with."""
+
+    def get(self, carrier, key: str) -> list[str] | None:
+        value = getattr(carrier, key, None)
+        return [value] if isinstance(value, str) else None
+
+    def keys(self, carrier) -> list[str]:
+        return []
+
+
+@before_task_publish.connect
+def inject_trace_context(headers: dict | None = None, **kwargs):
+    # Lets the task's span continue the trace of the request that queued it
+    if get_tracer() is not None and headers is not None:
+        propagate.inject(headers)
+
+
+# Spans of running tasks and the context tokens to restore, by task id
+_task_spans: dict[str, tuple[Span, object]] = {}
+
+
+@task_prerun.connect
+def start_task_span(task_id: str, task, *args, **kwargs):
+    tracer = get_tracer()
+    if tracer is None:
+        return
+    span = tracer.start_span(
+        f"celery.run {task.name}",
+        kind=SpanKind.CONSUMER,
+        context=propagate.extract(task.request, getter=_TaskRequestGetter()),
+        attributes={"celery.task_name": task.name, "celery.task_id": task_id},
+    )
+    token = context.attach(trace.set_span_in_context(span))
+    _task_spans[task_id] = (span, token)
+
+
+@task_postrun.connect
+def end_task_span(task_id: str, state: str | None = None, **kwargs):
+    entry = _task_spans.pop(task_id, None)
+    if entry is None:
+        return
+    span, token = entry
+    context.detach(token)
+    if state == "FAILURE":
+        span.set_status(StatusCode.ERROR)
+    span.set_attribute("celery.state", state or "UNKNOWN")
+    span.end()
 
 
 __all__ = ["celery"]
@@ -1,9 +1,85 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import QueuePool
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.settings import settings
+from app.tracing.sqlalchemy import trace_engine
+
+
+@dataclass
+class PoolStats:
+    size: int
+    max_overflow: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    # Since the engine was created
+    checkouts: int = 0
+    # Checkouts that took the last free connection, the next one had to wait
+    saturated_checkouts: int = 0
+
+
+_counters = {"checkouts": 0, "saturated_checkouts": 0}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    # Readers no longer block the writer and commits skip most fsyncs, still
+    # safe against application crashes
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}")
+    # Negative sizes are in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def create_engine(pool_size: int, max_overflow: int) -> AsyncEngine:
+    """Create the async engine from the `DB_*` settings with its own pool."""
+    url = make_url(str(settings.SQLALCHEMY_DATABASE_URI))
+    connect_args = {}
+    if url.get_backend_name() == "postgresql":
+        connect_args["prepared_statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+        if settings.DB_STATEMENT_TIMEOUT is not None:
+            timeout_ms = int(settings.DB_STATEMENT_TIMEOUT * 1000)
+            connect_args["server_settings"] = {"statement_timeout": str(timeout_ms)}
+
+    new_engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
 
-engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI), echo=True)
+    if url.get_backend_name() == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+    @event.listens_for(new_engine.sync_engine, "checkout")
+    def count_checkout(*args):
+        _counters["checkouts"] += 1
+        pool = new_engine.sync_engine.pool
+        if (
+            isinstance(pool, QueuePool)
+            and pool.checkedout() >= pool.size() + max_overflow
+        ):
+            _counters["saturated_checkouts"] += 1
+
+    trace_engine(new_engine)
+    return new_engine
+
+
+engine = create_engine(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
 
 
 AsyncSessionLocal = async_sessionmaker(
@@ -11,6 +87,38 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+def reset_engine(pool_size: int, max_overflow: int) -> None:
+    """
+    Replace the engine inherited from a parent process with a fresh one.
+
+    The parent's connections are left open for the parent to use, the new
+    engine opens its own on first use.
+    """
+    global engine
+
+    engine.sync_engine.dispose(close=False)
+    engine = create_engine(pool_size, max_overflow)
+    AsyncSessionLocal.configure(bind=engine)
+    _counters.update(checkouts=0, saturated_checkouts=0)
+
+
+def pool_stats() -> PoolStats:
+    """Return how busy the connection pool of this process is."""
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return PoolStats(
+            size=0, max_overflow=0, checked_in=0, checked_out=0, overflow=0
+        )
+    return PoolStats(
+        size=pool.size(),
+        max_overflow=pool._max_overflow,
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        overflow=max(pool.overflow(), 0),
+        **_counters,
+    )
+
+
 async def get_session():
     async with AsyncSessionLocal() as session:
         yield session
@@ -1,12 +1,21 @@
-from app.parser.time import parse_rate_string
+from app.parser.time import parse_bandwidth_string, parse_rate_string
 
 
-def rate_limit(*rates: str):
-    """Marks the endpoint with rate limit metadata."""
-    parsed_rates = [parse_rate_string(r) for r in rates]
+def rate_limit(*rates: str | None):
+    """
+    Marks the endpoint with rate limit metadata.
+
+    Request rates look like "3req/sec", bandwidth rates like "500MB/min".
+    Unset rates are skipped, so limits can come straight from settings.
+    """
+    parsed_rates = [parse_rate_string(r) for r in rates if r and "req/" in r.lower()]
+    parsed_bandwidth = [
+        parse_bandwidth_string(r) for r in rates if r and "req/" not in r.lower()
+    ]
 
     def decorator(func):
         func._rate_limits = parsed_rates
+        func._bandwidth_limits = parsed_bandwidth
         return func
 
     return decorator
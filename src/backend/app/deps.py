@@ -1,9 +1,6 @@
 from typing import Annotated, AsyncGenerator
 
-import aioboto3
 import jwt
-import redis.asyncio as redis
-from botocore.exceptions import ClientError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jwt import InvalidTokenError
@@ -13,10 +10,13 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from types_aiobotocore_s3 import S3Client
 
 from app import security
+from app.cache.client import get_redis_client
 from app.db import get_session
+from app.guards.bandwidth import BandwidthLimiter, bandwidth_limiter
 from app.models import User
 from app.schemas.token import TokenPayload
 from app.settings import settings
+from app.storage.client import open_s3_client
 
 bearer_scheme = HTTPBearer(auto_error=True)
 
@@ -39,31 +39,13 @@ async def get_current_user(session: SessionDep, token: TokenDep) -> User:
 
 
 async def get_s3_client() -> AsyncGenerator[S3Client, None]:
-    session = aioboto3.Session()
-    async with session.client(
-        "s3",
-        endpoint_url=settings.RUSTFS_ENDPOINT_URL,  # RustFS S3 API
-        aws_access_key_id=settings.RUSTFS_ACCESS_KEY,
-        aws_secret_access_key=settings.RUSTFS_SECRET_ACCESS_KEY,
-    ) as s3_client:
-        # Ensure bucket exists
-        try:
-            await s3_client.head_bucket(Bucket=settings.RUSTFS_BUCKET_NAME)
-        except ClientError:
-            await s3_client.create_bucket(Bucket=settings.RUSTFS_BUCKET_NAME)
-        yield s3_client
+    # Shared client, its lifetime is managed by the app lifespan
+    yield await open_s3_client()
 
 
-async def get_redis():
-    client = redis.from_url(
-        settings.REDIS_ENDPOINT,
-        encoding="utf-8",
-        decode_responses=True,
-    )
-    try:
-        yield client
-    finally:
-        await client.aclose()
+async def get_redis() -> AsyncGenerator[Redis, None]:
+    # Shared pooled client, its lifetime is managed by the app lifespan
+    yield get_redis_client()
 
 
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
@@ -74,5 +56,9 @@ TokenDep = Annotated[
 CurrentUser = Annotated[User, Depends(get_current_user)]
 S3Dep = Annotated[S3Client, Depends(get_s3_client)]
 RedisDep = Annotated[Redis, Depends(get_redis)]
+UploadBandwidthDep = Annotated[BandwidthLimiter, Depends(bandwidth_limiter("upload"))]
+DownloadBandwidthDep = Annotated[
+    BandwidthLimiter, Depends(bandwidth_limiter("download"))
+]
 
 __all__ = ["SessionDep", "CurrentUser", "TokenDep", "S3Dep"]
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import logging
+from typing import Any, Callable, Iterable
+
+from fastapi import Request
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError, RedisError
+
+from app.cache.client import get_redis_client
+from app.guards.rate_limit import client_id, iter_endpoints
+from app.metrics.registry import TRANSFER_BYTES
+from app.parser.time import parse_bandwidth_string
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Books `cost` bytes on every key and returns the milliseconds the caller has
+# to wait before sending them. Each key holds the time its byte budget is
+# spent up to, so concurrent streams queue behind each other and share the
+# limit fairly instead of racing for it. ARGV holds the cost followed by
+# (limit, window in ms, burst in ms) for every key.
+LUA_BANDWIDTH = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + tonumber(time[2]) / 1000
+local cost = tonumber(ARGV[1])
+local delay = 0
+
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[3 * i - 1])
+    local window = tonumber(ARGV[3 * i])
+    local burst = tonumber(ARGV[3 * i + 1])
+    local tat = tonumber(redis.call('GET', key)) or now
+    if tat < now then
+        tat = now
+    end
+
+    local new_tat = tat + cost * window / limit
+    if new_tat - burst - now > delay then
+        delay = new_tat - burst - now
+    end
+    redis.call(
+        'SET', key, string.format('%.3f', new_tat),
+        'PX', math.ceil(new_tat - now) + 1
+    )
+end
+
+return math.ceil(delay)
+"""
+LUA_BANDWIDTH_SHA = hashlib.sha1(LUA_BANDWIDTH.encode()).hexdigest()
+
+# Shared by every client, by direction of the stream
+_global_limits = {
+    direction: parse_bandwidth_string(limit) if limit else None
+    for direction, limit in (
+        ("upload", settings.UPLOAD_BANDWIDTH_GLOBAL_LIMIT),
+        ("download", settings.DOWNLOAD_BANDWIDTH_GLOBAL_LIMIT),
+    )
+}
+
+# Per client bandwidth limits of decorated endpoints, see resolve_bandwidth_limits
+_route_bandwidth: dict[Callable, list[tuple[int, int]]] = {}
+
+
+def _script_args(limit: int, window: int) -> tuple[int, int, int]:
+    window_ms = window * 1000
+    return limit, window_ms, min(window_ms, int(settings.BANDWIDTH_BURST * 1000))
+
+
+def resolve_bandwidth_limits(routes: Iterable[Any]) -> None:
+    """Collect the bandwidth rates of every `@rate_limit` endpoint at startup."""
+    _route_bandwidth.clear()
+    for endpoint in iter_endpoints(routes):
+        rates = getattr(endpoint, "_bandwidth_limits", None)
+        if rates:
+            _route_bandwidth[endpoint] = rates
+
+
+class BandwidthLimiter:
+    """
+    Paces one stream against the client's and the global byte budget.
+
+    Bytes are booked in Redis once at least BANDWIDTH_QUANTUM of them have
+    been consumed, so a stream costs one round trip per quantum rather than
+    one per chunk. A limiter without keys never touches Redis.
+    """
+
+    def __init__(
+        self,
+        direction: str,
+        redis_client: Redis | None,
+        keys: list[str],
+        args: list[int],
+    ):
+        self.direction = direction
+        self._bytes = TRANSFER_BYTES.labels(direction)
+        self.redis_client = redis_client
+        self.keys = keys
+        self.args = args
+        self._pending = 0
+
+    async def consume(self, amount: int) -> None:
+        """Account for `amount` bytes, sleeping while over the limit."""
+        self._bytes.inc(amount)
+        if not self.keys:
+            return
+        self._pending += amount
+        if self._pending < settings.BANDWIDTH_QUANTUM:
+            return
+
+        cost, self._pending = self._pending, 0
+        try:
+            delay_ms = await self._book(cost)
+        except RedisError as e:
+            # Never break a transfer halfway because the limiter is unavailable
+            logger.warning("Bandwidth limiter unavailable: %s", e)
+            return
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    async def _book(self, cost: int) -> int:
+        keys = self.keys
+        try:
+            return await self.redis_client.evalsha(
+                LUA_BANDWIDTH_SHA, len(keys), *keys, cost, *self.args
+            )
+        except NoScriptError:
+            await self.redis_client.script_load(LUA_BANDWIDTH)
+            return await self.redis_client.evalsha(
+                LUA_BANDWIDTH_SHA, len(keys), *keys, cost, *self.args
+            )
+
+
+def bandwidth_limiter(direction: str):
+    """Dependency returning a limiter for an "upload" or "download" stream."""
+
+    async def get_bandwidth_limiter(request: Request) -> BandwidthLimiter:
+        keys = []
+        args = []
+
+        endpoint = request.scope.get("endpoint")
+        rates = _route_bandwidth.get(endpoint)
+        if rates:
+            user_id = client_id(request)
+            for limit, window in rates:
+                keys.append(f"bw:{user_id}:{endpoint.__name__}:{window}")
+                args.extend(_script_args(limit, window))
+
+        global_limit = _global_limits[direction]
+        if global_limit:
+            keys.append(f"bw:global:{direction}")
+            args.extend(_script_args(*global_limit))
+
+        return BandwidthLimiter(
+            direction, get_redis_client() if keys else None, keys, args
+        )
+
+    return get_bandwidth_limiter
@@ -1,44 +1,184 @@
+import hashlib
+import math
 import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
 
-from fastapi import HTTPException, Request
+from fastapi import HTTPException
+from fastapi.requests import HTTPConnection
+from opentelemetry.trace import SpanKind
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
 
-from app.deps import RedisDep
+from app.cache.client import get_redis_client
+from app.metrics.registry import RATE_LIMIT_REJECTIONS
+from app.settings import settings
+from app.tracing.provider import span
 
+# GCRA over every (limit, window) pair of an endpoint at once. Each key holds
+# only its theoretical arrival time, and nothing is consumed unless every
+# window allows the request. Returns {0, 0} when allowed, otherwise the
+# 1-based index of the strictest failing window and the milliseconds until
+# a request would be allowed again.
 LUA_RATELIMIT = """
-local key = KEYS[1]
-local now = tonumber(ARGV[1])
-local window = tonumber(ARGV[2])
-local limit = tonumber(ARGV[3])
-local clear_before = now - window
-
-redis.call('ZREMRANGEBYSCORE', key, 0, clear_before)
-local amount = redis.call('ZCARD', key)
-
-if amount < limit then
-    redis.call('ZADD', key, now, now)
-    redis.call('EXPIRE', key, window)
-    return 0
-else
-    return 1
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local new_tats = {}
+local blocked = 0
+local retry_after = 0
+
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[2 * i - 1])
+    local window = tonumber(ARGV[2 * i])
+    local tat = tonumber(redis.call('GET', key)) or now
+    if tat < now then
+        tat = now
+    end
+
+    local new_tat = math.ceil(tat + window / limit)
+    local allow_at = new_tat - window
+    if allow_at > now and allow_at - now > retry_after then
+        blocked = i
+        retry_after = allow_at - now
+    end
+    new_tats[i] = new_tat
+end
+
+if blocked > 0 then
+    return {blocked, retry_after}
+end
+
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, new_tats[i], 'PX', new_tats[i] - now)
 end
+return {0, 0}
 """
+LUA_RATELIMIT_SHA = hashlib.sha1(LUA_RATELIMIT.encode()).hexdigest()
 
 
-async def rate_limiter_guard(request: Request, redis_client: RedisDep):
-    endpoint = request.scope.get("endpoint")
-    if not endpoint or not hasattr(endpoint, "_rate_limits"):
-        return
+@dataclass(frozen=True)
+class RouteRateLimits:
+    name: str
+    rates: list[tuple[int, int]]
+    # Script arguments, (limit, window in ms) for every rate
+    args: tuple[int, ...]
 
-    user_id = request.headers.get("X-Forwarded-For", request.client.host).split(",")[0]
-    now = time.time()
 
-    for limit, window in endpoint._rate_limits:
-        key = f"rl:{user_id}:{endpoint.__name__}:{window}"
+# Decorated endpoints, filled once at startup by resolve_rate_limits
+_route_limits: dict[Callable, RouteRateLimits] = {}
 
-        is_limited = await redis_client.eval(LUA_RATELIMIT, 1, key, now, window, limit)
+# Clients known to be blocked, mapped to the monotonic time they may retry at.
+# A rejected request consumes nothing, so these are turned away without Redis.
+_blocked: dict[tuple[str, str], tuple[float, int, int]] = {}
 
-        if is_limited:
-            raise HTTPException(
-                status_code=429,
-                detail=f"Rate limit exceeded: {limit} requests per {window}s.",
+
+def _check_blocked(client_key: tuple[str, str]) -> tuple[float, int, int] | None:
+    entry = _blocked.get(client_key)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _blocked[client_key]
+        return None
+    return entry
+
+
+def _remember_blocked(client_key: tuple[str, str], entry: tuple[float, int, int]):
+    if settings.RATE_LIMIT_LOCAL_CACHE_SIZE <= 0:
+        return
+    if len(_blocked) >= settings.RATE_LIMIT_LOCAL_CACHE_SIZE:
+        now = time.monotonic()
+        for key in [key for key, value in _blocked.items() if value[0] <= now]:
+            del _blocked[key]
+        if len(_blocked) >= settings.RATE_LIMIT_LOCAL_CACHE_SIZE:
+            return
+    _blocked[client_key] = entry
+
+
+async def _run_ratelimit(redis_client: Redis, keys: list[str], args: tuple[int, ...]):
+    """Run the script by its SHA, loading it once per Redis server."""
+    with span(
+        "redis EVALSHA ratelimit",
+        kind=SpanKind.CLIENT,
+        attributes={"db.system.name": "redis", "db.operation.name": "EVALSHA"},
+    ):
+        try:
+            return await redis_client.evalsha(
+                LUA_RATELIMIT_SHA, len(keys), *keys, *args
+            )
+        except NoScriptError:
+            await redis_client.script_load(LUA_RATELIMIT)
+            return await redis_client.evalsha(
+                LUA_RATELIMIT_SHA, len(keys), *keys, *args
             )
+
+
+def _rate_limit_exceeded(name: str, limit: int, window: int, retry_after: float):
+    RATE_LIMIT_REJECTIONS.labels(name).inc()
+    return HTTPException(
+        status_code=429,
+        detail=f"Rate limit exceeded: {limit} requests per {window}s.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def client_id(request: HTTPConnection) -> str:
+    return request.headers.get("X-Forwarded-For", request.client.host).split(",")[0]
+
+
+def iter_endpoints(routes: Iterable[Any]):
+    for route in routes:
+        # Included routers keep their routes on the original router
+        original_router = getattr(route, "original_router", None)
+        if original_router is not None:
+            yield from iter_endpoints(original_router.routes)
+            continue
+        endpoint = getattr(route, "endpoint", None)
+        if endpoint is not None:
+            yield endpoint
+
+
+def resolve_rate_limits(routes: Iterable[Any]) -> None:
+    """Collect the `@rate_limit` metadata of every endpoint, once at startup."""
+    _route_limits.clear()
+    for endpoint in iter_endpoints(routes):
+        rates = getattr(endpoint, "_rate_limits", None)
+        if not rates:
+            continue
+        _route_limits[endpoint] = RouteRateLimits(
+            name=endpoint.__name__,
+            rates=rates,
+            args=tuple(
+                value for limit, window in rates for value in (limit, window * 1000)
+            ),
+        )
+
+
+async def rate_limiter_guard(request: HTTPConnection):
+    # HTTPConnection rather than Request, so WebSocket routes resolve it too
+    # Endpoints without limits return here, before Redis is involved at all
+    route_limits = _route_limits.get(request.scope.get("endpoint"))
+    if route_limits is None:
+        return
+
+    user_id = client_id(request)
+    client_key = (user_id, route_limits.name)
+
+    blocked = _check_blocked(client_key)
+    if blocked:
+        retry_at, limit, window = blocked
+        raise _rate_limit_exceeded(
+            route_limits.name, limit, window, retry_at - time.monotonic()
+        )
+
+    keys = [
+        f"rl:{user_id}:{route_limits.name}:{window}" for _, window in route_limits.rates
+    ]
+    blocked_index, retry_after_ms = await _run_ratelimit(
+        get_redis_client(), keys, route_limits.args
+    )
+    if blocked_index:
+        limit, window = route_limits.rates[blocked_index - 1]
+        retry_after = retry_after_ms / 1000
+        _remember_blocked(client_key, (time.monotonic() + retry_after, limit, window))
+        raise _rate_limit_exceeded(route_limits.name, limit, window, retry_after)
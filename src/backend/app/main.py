@@ -1,8 +1,17 @@
+from contextlib import asynccontextmanager
+
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.guards.rate_limit import rate_limiter_guard
+from app.cache.client import close_redis_client
+from app.guards.bandwidth import resolve_bandwidth_limits
+from app.guards.rate_limit import rate_limiter_guard, resolve_rate_limits
+from app.metrics.middleware import MetricsMiddleware
 from app.settings import settings
+from app.speedtest.engine import get_random_source
+from app.storage.client import close_s3_client, open_s3_client
+from app.tracing.middleware import TracingMiddleware
+from app.tracing.provider import configure_tracing, shutdown_tracing
 
 # logging.basicConfig(
 #     level=logging.INFO,
@@ -11,9 +20,25 @@ from app.settings import settings
 # )
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_tracing("chithi-backend")
+    await open_s3_client()
+    # Every route is registered by now
+    resolve_rate_limits(app.routes)
+    resolve_bandwidth_limits(app.routes)
+    # Fill the speedtest buffer before the first test instead of during it
+    get_random_source()
+    yield
+    await close_s3_client()
+    await close_redis_client()
+    shutdown_tracing()
+
+
 app = FastAPI(
     root_path=settings.ROOT_PATH,
     openapi_url="/openapi.json",
+    lifespan=lifespan,
     dependencies=[Depends(rate_limiter_guard)],
 )
 app.add_middleware(
@@ -21,8 +46,28 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "Content-Range",
+        "ETag",
+        "X-Download-Token",
+        "Location",
+        "Upload-Offset",
+        "Upload-Length",
+        "X-Next-Cursor",
+    ],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    from app.routes.metrics import router as metrics_router
+
+    app.include_router(metrics_router)
+
+if settings.TRACING_ENABLED:
+    # Added last so it runs first and times the other middleware too
+    app.add_middleware(TracingMiddleware)
+
 from app.routes.admin.config import router as admin_config_router
 
 app.include_router(admin_config_router, prefix="/admin")
@@ -35,6 +80,10 @@ from app.routes.admin.files import router as admin_file_router
 
 app.include_router(admin_file_router, prefix="/admin")
 
+from app.routes.admin.db import router as admin_db_router
+
+app.include_router(admin_db_router, prefix="/admin")
+
 from app.routes.config import router as config_router
 
 app.include_router(config_router)
@@ -51,6 +100,14 @@ from app.routes.upload import router as upload_router
 
 app.include_router(upload_router)
 
+from app.routes.direct_upload import router as direct_upload_router
+
+app.include_router(direct_upload_router)
+
+from app.routes.resumable_upload import router as resumable_upload_router
+
+app.include_router(resumable_upload_router)
+
 from app.routes.download import router as download_router
 
 app.include_router(download_router)
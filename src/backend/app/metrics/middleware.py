@@ -0,0 +1,42 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics.registry import REQUEST_DURATION
+
+
+class MetricsMiddleware:
+    """
+    Time every HTTP request by the route that handled it.
+
+    Streaming responses are timed until their last byte is sent. Requests
+    that matched no route share one label, so probing random paths cannot
+    create new series.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Routing stores the matched route in the shared scope
+            route = scope.get("route")
+            handler = getattr(route, "name", None) or "unmatched"
+            REQUEST_DURATION.labels(scope["method"], handler, str(status_code)).observe(
+                time.perf_counter() - start
+            )
@@ -0,0 +1,120 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from app.db import pool_stats
+
+# Buckets for calls that normally finish in milliseconds
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+# Requests include whole transfers, which may take minutes
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+REQUEST_DURATION = Histogram(
+    "chithi_http_request_duration_seconds",
+    "Time from receiving a request until its response is sent",
+    ["method", "handler", "status"],
+    buckets=REQUEST_BUCKETS,
+)
+S3_DURATION = Histogram(
+    "chithi_s3_request_duration_seconds",
+    "Time an S3 call took, including retries",
+    ["operation"],
+    buckets=FAST_BUCKETS + (5, 10, 30),
+)
+S3_ERRORS = Counter(
+    "chithi_s3_request_errors",
+    "S3 calls that returned an error or did not get a response",
+    ["operation"],
+)
+TRANSFER_BYTES = Counter(
+    "chithi_transfer_bytes",
+    "Bytes of file, upload and speedtest data received or sent",
+    ["direction"],
+)
+ACTIVE_STREAMS = Gauge(
+    "chithi_active_streams",
+    "Uploads and downloads currently transferring data",
+    ["direction"],
+    multiprocess_mode="livesum",
+)
+# Both directions are exported from the start, also while idle
+for direction in ("upload", "download"):
+    TRANSFER_BYTES.labels(direction)
+    ACTIVE_STREAMS.labels(direction)
+
+QUOTA_RESERVE_DURATION = Histogram(
+    "chithi_quota_reserve_duration_seconds",
+    "Time taken to check and reserve storage for an upload",
+    buckets=FAST_BUCKETS,
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    "chithi_rate_limit_rejections",
+    "Requests rejected by the rate limiter",
+    ["handler"],
+)
+TASK_DURATION = Histogram(
+    "chithi_task_duration_seconds",
+    "Time a Celery task took to run",
+    ["task", "state"],
+    buckets=REQUEST_BUCKETS,
+)
+DELETED_FILES = Counter(
+    "chithi_deleted_files",
+    "Expired files removed from storage and the database",
+)
+DELETED_BYTES = Counter(
+    "chithi_deleted_bytes",
+    "Bytes of expired files removed from storage",
+)
+
+
+class DatabasePoolCollector(Collector):
+    """Reads the connection pool of this process on every scrape."""
+
+    def collect(self):
+        stats = pool_stats()
+        gauges = {
+            "size": stats.size,
+            "max_overflow": stats.max_overflow,
+            "checked_in": stats.checked_in,
+            "checked_out": stats.checked_out,
+            "overflow": stats.overflow,
+        }
+        for name, value in gauges.items():
+            yield GaugeMetricFamily(
+                f"chithi_db_pool_{name}", f"Database connection pool {name}", value
+            )
+        yield CounterMetricFamily(
+            "chithi_db_pool_checkouts",
+            "Connections handed out by the pool",
+            stats.checkouts,
+        )
+        yield CounterMetricFamily(
+            "chithi_db_pool_saturated_checkouts",
+            "Checkouts that took the last free connection",
+            stats.saturated_checkouts,
+        )
+
+
+REGISTRY.register(DatabasePoolCollector())
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Return the exposition of every metric and its content type."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Worker processes write their samples to files, merge them here
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
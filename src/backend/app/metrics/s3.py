@@ -0,0 +1,43 @@
+import time
+
+from types_aiobotocore_s3 import S3Client
+
+from app.metrics.registry import S3_DURATION, S3_ERRORS
+
+_STARTED_AT = "metrics_started_at"
+
+
+def _operation(event_name: str) -> str:
+    # Events are named like "before-call.s3.UploadPart"
+    return event_name.rsplit(".", 1)[-1]
+
+
+def _before_call(event_name: str, context: dict, **kwargs) -> None:
+    context[_STARTED_AT] = time.perf_counter()
+
+
+def _after_call(event_name: str, context: dict, http_response, **kwargs) -> None:
+    started_at = context.pop(_STARTED_AT, None)
+    if started_at is None:
+        return
+    operation = _operation(event_name)
+    S3_DURATION.labels(operation).observe(time.perf_counter() - started_at)
+    if http_response.status_code >= 300:
+        S3_ERRORS.labels(operation).inc()
+
+
+def _after_call_error(event_name: str, context: dict, **kwargs) -> None:
+    started_at = context.pop(_STARTED_AT, None)
+    if started_at is None:
+        return
+    operation = _operation(event_name)
+    S3_DURATION.labels(operation).observe(time.perf_counter() - started_at)
+    S3_ERRORS.labels(operation).inc()
+
+
+def instrument_s3_client(client: S3Client) -> None:
+    """Record the latency of every call the client makes, by operation."""
+    events = client.meta.events
+    events.register("before-call.s3", _before_call)
+    events.register("after-call.s3", _after_call)
+    events.register("after-call-error.s3", _after_call_error)
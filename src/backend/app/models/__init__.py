@@ -1,5 +1,7 @@
 from sqlmodel import SQLModel as SQLModel
 
 from .config import Config as Config
+from .direct_upload import DirectUpload as DirectUpload
 from .files import File as File
+from .resumable_upload import ResumableUpload as ResumableUpload
 from .user import User as User
@@ -1,12 +1,12 @@
 from datetime import timedelta
-from uuid import UUID
+from uuid import UUID, uuid7
 
 from sqlalchemy import Connection, FromClause, event
-from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapper
-from sqlmodel import BigInteger, Column, Field, Integer, SQLModel, String, select, text
+from sqlmodel import BigInteger, Column, Field, SQLModel, select
 
 from app.converter.bytes import ByteSize
+from app.models.types import IntegerList, StringList
 
 
 class ConfigUpdate(SQLModel):
@@ -42,27 +42,19 @@ class ConfigIn(SQLModel):
     # Customizable fields
     download_configs: list[int] = Field(
         default=[10],
-        sa_column=Column(ARRAY(Integer)),
+        sa_column=Column(IntegerList()),
     )
     time_configs: list[int] = Field(
         default=[int(timedelta(days=7).total_seconds())],
-        sa_column=Column(ARRAY(Integer)),
+        sa_column=Column(IntegerList()),
     )
 
-    allowed_file_types: list[str] = Field(default=[], sa_column=Column(ARRAY(String)))
-    banned_file_types: list[str] = Field(default=[], sa_column=Column(ARRAY(String)))
+    allowed_file_types: list[str] = Field(default=[], sa_column=Column(StringList()))
+    banned_file_types: list[str] = Field(default=[], sa_column=Column(StringList()))
 
 
 class Config(ConfigIn, table=True):
-    id: UUID = Field(
-        default=None,
-        primary_key=True,
-        sa_column_kwargs={
-            "server_default": text(
-                "uuidv7()",
-            )
-        },
-    )
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
 
 
 @event.listens_for(Config, "before_update")
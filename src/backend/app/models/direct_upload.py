@@ -0,0 +1,59 @@
+from datetime import datetime
+from uuid import UUID, uuid7
+
+from sqlalchemy import BigInteger, Column
+from sqlmodel import Field, SQLModel
+
+from app.models.types import AwareDateTime
+
+
+class DirectUploadCreate(SQLModel):
+    filename: str | None = None
+    content_type: str | None = None
+    size: int = Field(gt=0)
+    expire_after_n_download: int
+    expire_after: int
+
+
+class PresignedPart(SQLModel):
+    part_number: int
+    url: str
+
+
+class DirectUploadOut(SQLModel):
+    id: UUID
+    key: str
+    part_size: int
+    parts: list[PresignedPart]
+    expires_at: datetime
+
+
+class CompletedPart(SQLModel):
+    part_number: int
+    etag: str
+
+
+class DirectUploadComplete(SQLModel):
+    parts: list[CompletedPart]
+
+
+class DirectUpload(SQLModel, table=True):
+    """A multipart upload the browser writes straight to the bucket."""
+
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
+    key: str = Field(index=True, unique=True)
+    upload_id: str = Field()
+
+    filename: str = Field()
+    # Declared size, reserved against the storage quota until completion
+    size: int = Field(sa_column=Column(BigInteger(), nullable=False))
+    part_size: int = Field(sa_column=Column(BigInteger(), nullable=False))
+
+    expire_after_n_download: int = Field()
+    expire_after: int = Field()
+
+    created_at: datetime = Field(sa_column=Column(AwareDateTime(), nullable=False))
+    # Abandoned uploads are aborted by the sweeper after this point
+    expires_at: datetime = Field(
+        sa_column=Column(AwareDateTime(), nullable=False, index=True)
+    )
@@ -1,11 +1,13 @@
 from datetime import datetime, timezone
 from typing import Self
-from uuid import UUID
+from uuid import UUID, uuid7
 
-from pydantic import model_validator
-from sqlalchemy import BigInteger, Column, DateTime, UniqueConstraint, text
+from pydantic import field_validator, model_validator
+from sqlalchemy import BigInteger, Column, Index, UniqueConstraint, func, text
 from sqlmodel import Field, SQLModel
 
+from app.models.types import AwareDateTime
+
 
 class FileInformationOut(SQLModel):
     id: UUID
@@ -18,6 +20,16 @@ class FileInformationOut(SQLModel):
     expires_at: datetime
     expire_after_n_download: int
 
+    @field_validator("size", mode="before")
+    @classmethod
+    def validate_size(cls, value: int | None) -> int:
+        # Files uploaded before sizes were recorded have none
+        return value or 0
+
+
+class FileCacheEntry(FileInformationOut):
+    key: str
+
 
 class FileOut(SQLModel):
     # Unique Identifier for the S3 storage
@@ -25,28 +37,40 @@ class FileOut(SQLModel):
 
 
 class File(FileOut, table=True):
-    id: UUID = Field(
-        default=None,
-        primary_key=True,
-        sa_column_kwargs={"server_default": text("uuidv7()")},
-    )
+    # Generated here rather than by the database, SQLite has no uuidv7()
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
     filename: str = Field()
 
     # Control expiry
-    expires_at: datetime = Field(
-        sa_column=Column(DateTime(timezone=True), nullable=False)
-    )
+    expires_at: datetime = Field(sa_column=Column(AwareDateTime(), nullable=False))
     expire_after_n_download: int = Field()
+    # Set by the download that used up the last slot
+    exhausted_at: datetime | None = Field(
+        default=None, sa_column=Column(AwareDateTime(), nullable=True)
+    )
 
     # Tracking downloads
     download_count: int = Field(default=0, sa_column=Column(BigInteger()))
-    created_at: datetime = Field(
-        sa_column=Column(DateTime(timezone=True), nullable=False)
-    )
+    created_at: datetime = Field(sa_column=Column(AwareDateTime(), nullable=False))
 
     size: int = Field(sa_column=Column(BigInteger()))
 
-    __table_args__ = (UniqueConstraint("id", "key"),)
+    __table_args__ = (
+        UniqueConstraint("id", "key"),
+        Index("ix_file_key", "key", unique=True),
+        # Keyset pagination of the admin listing, the sweeper uses the first
+        Index("ix_file_expires_at_id", "expires_at", "id"),
+        # Files without a size sort as 0, the listing orders by the same
+        # expression
+        Index("ix_file_size_id", func.coalesce(text("size"), 0), "id"),
+        # Only exhausted rows are indexed, the sweeper is the only reader
+        Index(
+            "ix_file_exhausted_at",
+            "exhausted_at",
+            postgresql_where=text("exhausted_at IS NOT NULL"),
+            sqlite_where=text("exhausted_at IS NOT NULL"),
+        ),
+    )
 
     @property
     def is_expired(self) -> bool:
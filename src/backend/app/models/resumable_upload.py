@@ -0,0 +1,72 @@
+from datetime import datetime
+from uuid import UUID, uuid7
+
+from sqlalchemy import BigInteger, Column, text
+from sqlmodel import Field, SQLModel
+
+from app.models.types import AwareDateTime
+
+
+class ResumableUploadCreate(SQLModel):
+    filename: str | None = None
+    content_type: str | None = None
+    size: int = Field(gt=0)
+    expire_after_n_download: int
+    expire_after: int
+
+
+class ResumableUploadOut(SQLModel):
+    id: UUID
+    key: str
+    size: int
+    offset: int
+    expires_at: datetime
+
+
+class ResumableUpload(SQLModel, table=True):
+    """An upload sent in `PATCH` requests that can resume after a dropped connection."""
+
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
+    key: str = Field(index=True, unique=True)
+    upload_id: str = Field()
+
+    filename: str = Field()
+    content_type: str = Field()
+    # Declared size, reserved against the storage quota until completion
+    size: int = Field(sa_column=Column(BigInteger(), nullable=False))
+    part_size: int = Field(sa_column=Column(BigInteger(), nullable=False))
+
+    # Bytes received so far, the ones past the last full part are kept in a
+    # separate tail object until the next request completes the part
+    offset: int = Field(
+        default=0,
+        sa_column=Column(BigInteger(), nullable=False, server_default=text("0")),
+    )
+    tail_size: int = Field(
+        default=0,
+        sa_column=Column(BigInteger(), nullable=False, server_default=text("0")),
+    )
+    part_count: int = Field(default=0)
+
+    expire_after_n_download: int = Field()
+    expire_after: int = Field()
+
+    created_at: datetime = Field(sa_column=Column(AwareDateTime(), nullable=False))
+    # Pushed back by every request, idle uploads are aborted after this point
+    expires_at: datetime = Field(
+        sa_column=Column(AwareDateTime(), nullable=False, index=True)
+    )
+
+    def tail_key_at(self, offset: int) -> str:
+        """
+        Object holding the bytes past the last full part at `offset`.
+
+        Every offset gets its own object, a request that fails to move the
+        offset never overwrites the tail the row still points to.
+        """
+        return f"{self.key}.partial.{offset}"
+
+    @property
+    def tail_key(self) -> str:
+        """Object holding the bytes received past the last full part."""
+        return self.tail_key_at(self.offset)
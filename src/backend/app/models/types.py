@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, DateTime, Integer, String, TypeDecorator
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Dialect
+
+
+class AwareDateTime(TypeDecorator[datetime]):
+    """
+    `DateTime(timezone=True)` that always hands back aware datetimes.
+
+    SQLite has no time zone support and stores datetimes as text, so they
+    are written there in UTC and read back with the UTC offset attached.
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(
+        self, value: datetime | None, dialect: Dialect
+    ) -> datetime | None:
+        if value is not None and dialect.name == "sqlite" and value.tzinfo:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def process_result_value(
+        self, value: datetime | None, dialect: Dialect
+    ) -> datetime | None:
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+
+def IntegerList():
+    """An integer array on PostgreSQL, a JSON list on SQLite."""
+    return ARRAY(Integer).with_variant(JSON(), "sqlite")
+
+
+def StringList():
+    """A string array on PostgreSQL, a JSON list on SQLite."""
+    return ARRAY(String).with_variant(JSON(), "sqlite")
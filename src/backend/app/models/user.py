@@ -1,6 +1,5 @@
-from uuid import UUID
+from uuid import UUID, uuid7
 
-from sqlalchemy import text
 from sqlmodel import Field, SQLModel
 
 
@@ -21,14 +20,6 @@ class UserOut(SQLModel):
 
 
 class User(UserOut, table=True):
-    id: UUID = Field(
-        default=None,
-        primary_key=True,
-        sa_column_kwargs={
-            "server_default": text(
-                "uuidv7()",
-            )
-        },
-    )
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
 
     password_hash: str = Field()
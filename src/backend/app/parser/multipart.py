@@ -0,0 +1,149 @@
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request, status
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+
+class StreamingMultipart:
+    """
+    Parse a multipart/form-data body while it arrives.
+
+    Unlike `UploadFile`, the file part is never spooled to a temporary file:
+    its data is handed out as it comes off the socket. Other parts are small
+    form fields and are collected into `fields`, those sent before the file
+    are available as soon as its first data is.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        file_field: str = "file",
+        max_field_size: int = 64 * 1024,
+        max_fields: int = 32,
+    ):
+        content_type, options = parse_options_header(
+            request.headers.get("Content-Type", "")
+        )
+        boundary = options.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Expected a multipart/form-data body",
+            )
+
+        self.request = request
+        self.file_field = file_field
+        self.max_field_size = max_field_size
+        self.max_fields = max_fields
+
+        self.fields: dict[str, str] = {}
+        self.filename: str | None = None
+        self.content_type: str | None = None
+
+        self._file_seen = False
+        self._in_file = False
+        self._field_name = ""
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+        self._field_value = bytearray()
+        self._file_data: list[memoryview] = []
+
+        self._parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+
+    async def file_chunks(self) -> AsyncIterator[memoryview]:
+        """Yield the data of the file part, then finish parsing the body."""
+        try:
+            async for chunk in self.request.stream():
+                self._parser.write(chunk)
+                for data in self._file_data:
+                    yield data
+                self._file_data.clear()
+            self._parser.finalize()
+        except MultipartParseError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Malformed multipart body: {e}",
+            )
+        except UnicodeDecodeError:
+            # Raised by the callbacks decoding names, filenames and fields
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Form field names and values must be UTF-8",
+            )
+
+        if not self._file_seen:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail=f"Missing file field '{self.file_field}'",
+            )
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._field_value = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        name = options.get(b"name", b"").decode()
+        filename = options.get(b"filename")
+
+        self._in_file = name == self.file_field and filename is not None
+        if self._in_file:
+            if self._file_seen:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Only one file can be uploaded at a time",
+                )
+            self._file_seen = True
+            self.filename = filename.decode()
+            content_type = self._headers.get(b"content-type")
+            self.content_type = content_type.decode() if content_type else None
+        else:
+            if len(self.fields) >= self.max_fields:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Too many form fields",
+                )
+            self._field_name = name
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            # A view into the received chunk, the data is not copied here
+            self._file_data.append(memoryview(data)[start:end])
+            return
+
+        if len(self._field_value) + end - start > self.max_field_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Form field is too large",
+            )
+        self._field_value += data[start:end]
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            return
+        self.fields[self._field_name] = self._field_value.decode()
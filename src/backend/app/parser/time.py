@@ -1,5 +1,7 @@
 import re
 
+from app.converter.bytes import ByteSize
+
 
 def parse_rate_string(rate_string: str) -> tuple[int, int]:
     pattern = r"(\d+)req/(sec|min|hour|day)"
@@ -9,3 +11,15 @@ def parse_rate_string(rate_string: str) -> tuple[int, int]:
 
     seconds_map = {"sec": 1, "min": 60, "hour": 3600, "day": 86400}
     return int(match.group(1)), seconds_map[match.group(2)]
+
+
+def parse_bandwidth_string(rate_string: str) -> tuple[int, int]:
+    """Parse a rate like "500MB/min" into (bytes, seconds)."""
+    pattern = r"(\d+)(b|kb|mb|gb|tb)/(sec|min|hour|day)"
+    match = re.fullmatch(pattern, rate_string.lower())
+    if not match:
+        raise ValueError(f"Invalid bandwidth: {rate_string}")
+
+    seconds_map = {"sec": 1, "min": 60, "hour": 3600, "day": 86400}
+    amount = ByteSize(**{match.group(2): int(match.group(1))}).total_bytes()
+    return amount, seconds_map[match.group(3)]
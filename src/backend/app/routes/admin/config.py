@@ -3,7 +3,8 @@ from http import HTTPStatus
 from fastapi import APIRouter, HTTPException
 from sqlmodel import select
 
-from app.deps import CurrentUser, SessionDep
+from app.cache.config import invalidate_config
+from app.deps import CurrentUser, RedisDep, SessionDep
 from app.models.config import Config, ConfigIn
 
 router = APIRouter()
@@ -13,6 +14,7 @@ router = APIRouter()
 async def change_config(
     _: CurrentUser,  # Only check for login here
     session: SessionDep,
+    redis_client: RedisDep,
     config_in: ConfigIn,
 ):
     config_object = select(Config)
@@ -26,4 +28,5 @@ async def change_config(
     session.add(config)
     await session.commit()
     await session.refresh(config)
+    await invalidate_config(redis_client)
     return config
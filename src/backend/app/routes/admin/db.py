@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+
+from app.db import PoolStats, pool_stats
+from app.deps import CurrentUser
+
+router = APIRouter()
+
+
+@router.get("/db/pool")
+async def show_pool_stats(_: CurrentUser) -> PoolStats:
+    """Connection pool usage of the process that served this request."""
+    return pool_stats()
@@ -1,26 +1,163 @@
+import base64
+import json
+from datetime import datetime, timezone
 from http import HTTPStatus
+from typing import Annotated, Any
+from uuid import UUID
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException
-from sqlmodel import select
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Response
+from sqlalchemy import ColumnElement, func, not_, or_, tuple_
+from sqlmodel import col, select
 
 from app.deps import CurrentUser, SessionDep
 from app.models.files import File, FileInformationOut, FileOut
+from app.schemas.files import (
+    FileFilter,
+    FileListQuery,
+    FileSort,
+    FileStats,
+    FileStatus,
+    SortOrder,
+)
 from app.tasks import delete_expired_file
 
 router = APIRouter()
 
+SORT_COLUMNS = {
+    FileSort.created: None,
+    FileSort.expires_at: col(File.expires_at),
+    # Matches the expression of ix_file_size_id, files without a size sort as 0
+    FileSort.size: func.coalesce(col(File.size), 0),
+}
+
+
+def _expired_clause(now: datetime) -> ColumnElement[bool]:
+    # Same rule as `File.is_expired`
+    return or_(
+        col(File.expires_at) < now,
+        col(File.download_count) >= col(File.expire_after_n_download),
+    )
+
+
+def _filter_clauses(filters: FileFilter, now: datetime) -> list[ColumnElement[bool]]:
+    clauses = []
+    if filters.status == FileStatus.expired:
+        clauses.append(_expired_clause(now))
+    elif filters.status == FileStatus.active:
+        clauses.append(not_(_expired_clause(now)))
+    if filters.min_size is not None:
+        clauses.append(col(File.size) >= filters.min_size)
+    if filters.max_size is not None:
+        clauses.append(col(File.size) <= filters.max_size)
+    if filters.created_after is not None:
+        clauses.append(col(File.created_at) >= filters.created_after)
+    if filters.created_before is not None:
+        clauses.append(col(File.created_at) < filters.created_before)
+    if filters.filename_prefix is not None:
+        clauses.append(
+            col(File.filename).startswith(filters.filename_prefix, autoescape=True)
+        )
+    return clauses
+
+
+def _encode_cursor(file_object: File, sort: FileSort) -> str:
+    value: Any = None
+    if sort == FileSort.expires_at:
+        value = file_object.expires_at.isoformat()
+    elif sort == FileSort.size:
+        value = file_object.size or 0
+    raw = json.dumps([value, str(file_object.id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: FileSort) -> tuple[Any, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, id = json.loads(raw)
+        if sort == FileSort.expires_at:
+            value = datetime.fromisoformat(value)
+        elif sort == FileSort.size:
+            value = int(value)
+        return value, UUID(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
+
 
 @router.get("/files", response_model=list[FileInformationOut])
 async def show_all_files(
     _: CurrentUser,  # Only check for login here
     session: SessionDep,
+    response: Response,
+    params: Annotated[FileListQuery, Query()],
 ):
-    query = select(File).order_by(File.id)  # type: ignore
+    """
+    List files one page at a time, ordered by `sort` and then by id.
+
+    When more files follow, `X-Next-Cursor` holds the `cursor` to pass for the
+    next page. Pages are found through the index instead of an offset, so
+    every page costs the same however deep it is.
+    """
+    now = datetime.now(timezone.utc)
+    query = select(File).where(*_filter_clauses(params, now))
+
+    sort_column = SORT_COLUMNS[params.sort]
+    descending = params.order == SortOrder.desc
+    if params.cursor is not None:
+        value, id = _decode_cursor(params.cursor, params.sort)
+        if sort_column is None:
+            key, position = col(File.id), id
+        else:
+            key, position = tuple_(sort_column, File.id), tuple_(value, id)
+        query = query.where(key < position if descending else key > position)
+
+    order_by = [col(File.id)]
+    if sort_column is not None:
+        order_by.insert(0, sort_column)
+    query = query.order_by(*(c.desc() if descending else c.asc() for c in order_by))
+    # One extra row tells whether another page follows
+    query = query.limit(params.limit + 1)
+
     result = await session.exec(query)
     file_objects = result.all()
+    if len(file_objects) > params.limit:
+        file_objects = file_objects[: params.limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(
+            file_objects[-1], params.sort
+        )
     return file_objects
 
 
+@router.get("/files/stats")
+async def file_stats(
+    _: CurrentUser,
+    session: SessionDep,
+    filters: Annotated[FileFilter, Query()],
+) -> FileStats:
+    """Count files and their bytes in one aggregate query, split by status."""
+    now = datetime.now(timezone.utc)
+    expired = _expired_clause(now)
+    size = func.coalesce(col(File.size), 0)
+    query = select(
+        func.count(),
+        func.coalesce(func.sum(size), 0),
+        func.count().filter(expired),
+        func.coalesce(func.sum(size).filter(expired), 0),
+        func.coalesce(func.sum(col(File.download_count)), 0),
+    ).where(*_filter_clauses(filters, now))
+
+    result = await session.exec(query)
+    count, total_bytes, expired_count, expired_bytes, downloads = result.one()
+    return FileStats(
+        count=count,
+        bytes=total_bytes,
+        active_count=count - expired_count,
+        active_bytes=total_bytes - expired_bytes,
+        expired_count=expired_count,
+        expired_bytes=expired_bytes,
+        downloads=downloads,
+    )
+
+
 @router.delete("/files/{id}")
 async def delete_file(
     _: CurrentUser,
@@ -1,19 +1,29 @@
 from http import HTTPStatus
+from typing import Annotated
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import select
+from fastapi import APIRouter, Header, HTTPException, Response
 
-from app.deps import SessionDep
-from app.models.config import Config
+from app.cache.config import get_cached_config
+from app.deps import RedisDep, SessionDep
 
 router = APIRouter()
 
 
 @router.get("/config")
-async def get_config(session: SessionDep):
-    config_object = select(Config)
-    result = await session.exec(config_object)
-    config_object = result.first()
-    if not config_object:
+async def get_config(
+    session: SessionDep,
+    redis_client: RedisDep,
+    if_none_match: Annotated[str | None, Header(alias="If-None-Match")] = None,
+):
+    cached = await get_cached_config(session, redis_client)
+    if not cached:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Config not found")
-    return config_object
+
+    # Clients may keep a copy but have to revalidate it on every use
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if if_none_match is not None:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        if "*" in tags or cached.etag in tags:
+            return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+    return Response(content=cached.body, media_type="application/json", headers=headers)
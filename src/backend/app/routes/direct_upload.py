@@ -0,0 +1,312 @@
+import math
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from botocore.exceptions import ClientError
+from fastapi import APIRouter, HTTPException, status
+from sqlmodel import delete, select
+
+from app.cache.config import get_cached_config
+from app.cache.files import cache_file
+from app.deps import RedisDep, S3Dep, SessionDep
+from app.models.direct_upload import (
+    DirectUpload,
+    DirectUploadComplete,
+    DirectUploadCreate,
+    DirectUploadOut,
+    PresignedPart,
+)
+from app.models.files import File, FileOut
+from app.settings import settings
+from app.storage.client import open_presign_client
+from app.storage.quota import (
+    commit_reservation,
+    free_storage,
+    release_reservation,
+    reserve_storage,
+)
+
+router = APIRouter(prefix="/upload/direct")
+
+# S3 limits for multipart uploads
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10_000
+
+
+async def _get_direct_upload(
+    session: SessionDep, id: uuid.UUID, for_update: bool = False
+) -> DirectUpload:
+    query = select(DirectUpload).where(DirectUpload.id == id)
+    if for_update:
+        query = query.with_for_update()
+    result = await session.exec(query)
+    direct_upload = result.one_or_none()
+    if not direct_upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return direct_upload
+
+
+def _raise_if_gone(e: ClientError) -> None:
+    """Turn an upload completed or aborted by another request into a 404."""
+    if e.response.get("Error", {}).get("Code") == "NoSuchUpload":
+        raise HTTPException(status_code=404, detail="Upload not found") from e
+
+
+async def _abort_direct_upload(
+    direct_upload: DirectUpload,
+    session: SessionDep,
+    s3: S3Dep,
+    redis_client: RedisDep,
+) -> None:
+    await s3.abort_multipart_upload(
+        Bucket=settings.RUSTFS_BUCKET_NAME,
+        Key=direct_upload.key,
+        UploadId=direct_upload.upload_id,
+    )
+    await release_reservation(redis_client, direct_upload.key)
+    await session.delete(direct_upload)
+    await session.commit()
+
+
+@router.post("", response_model=DirectUploadOut)
+async def create_direct_upload(
+    upload_in: DirectUploadCreate,
+    s3: S3Dep,
+    session: SessionDep,
+    redis_client: RedisDep,
+):
+    """
+    Start a multipart upload the client writes straight to storage.
+
+    The declared size is reserved against the quota up front and one presigned
+    `UploadPart` URL is returned for every part.
+    """
+    cached_config = await get_cached_config(session, redis_client)
+    if not cached_config:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Configuration not found",
+        )
+    config = cached_config.config
+
+    if (
+        config.max_file_size_limit is not None
+        and upload_in.size > config.max_file_size_limit
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File size exceeds the maximum allowed limit",
+        )
+
+    part_size = max(
+        settings.DIRECT_UPLOAD_PART_SIZE,
+        MIN_PART_SIZE,
+        math.ceil(upload_in.size / MAX_PARTS),
+    )
+    part_count = math.ceil(upload_in.size / part_size)
+    key = str(uuid.uuid7())
+
+    if not await reserve_storage(
+        redis_client, session, key, upload_in.size, config.total_storage_limit
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Storage quota exceeded",
+        )
+
+    try:
+        resp = await s3.create_multipart_upload(
+            Bucket=settings.RUSTFS_BUCKET_NAME,
+            Key=key,
+            ContentType=upload_in.content_type or "application/octet-stream",
+        )
+    except Exception:
+        await release_reservation(redis_client, key)
+        raise
+    upload_id = resp["UploadId"]
+
+    now = datetime.now(timezone.utc)
+    direct_upload = DirectUpload(
+        key=key,
+        upload_id=upload_id,
+        filename=upload_in.filename or str(uuid.uuid7()),
+        size=upload_in.size,
+        part_size=part_size,
+        expire_after_n_download=upload_in.expire_after_n_download,
+        expire_after=upload_in.expire_after,
+        created_at=now,
+        expires_at=now + timedelta(seconds=settings.DIRECT_UPLOAD_SESSION_TTL),
+    )
+    session.add(direct_upload)
+    try:
+        await session.commit()
+    except Exception:
+        await s3.abort_multipart_upload(
+            Bucket=settings.RUSTFS_BUCKET_NAME, Key=key, UploadId=upload_id
+        )
+        await release_reservation(redis_client, key)
+        raise
+    await session.refresh(direct_upload)
+
+    presign_client = await open_presign_client()
+    parts = [
+        PresignedPart(
+            part_number=part_number,
+            url=await presign_client.generate_presigned_url(
+                "upload_part",
+                Params={
+                    "Bucket": settings.RUSTFS_BUCKET_NAME,
+                    "Key": key,
+                    "UploadId": upload_id,
+                    "PartNumber": part_number,
+                },
+                ExpiresIn=settings.DIRECT_UPLOAD_URL_EXPIRY,
+            ),
+        )
+        for part_number in range(1, part_count + 1)
+    ]
+
+    return DirectUploadOut(
+        id=direct_upload.id,
+        key=key,
+        part_size=part_size,
+        parts=parts,
+        expires_at=direct_upload.expires_at,
+    )
+
+
+@router.post("/{id}/complete")
+async def complete_direct_upload(
+    id: uuid.UUID,
+    upload_in: DirectUploadComplete,
+    s3: S3Dep,
+    session: SessionDep,
+    redis_client: RedisDep,
+) -> FileOut:
+    """
+    Validate the parts stored in the bucket and turn the upload into a file.
+
+    Part sizes are read back from storage rather than trusted from the client.
+    The row stays locked until the file replaces it, a concurrent completion
+    waits and then finds the upload gone. Only the request that deletes the
+    row creates the file, also on databases without row locks.
+    """
+    direct_upload = await _get_direct_upload(session, id, for_update=True)
+    if direct_upload.expires_at <= datetime.now(timezone.utc):
+        # Its parts are aborted by the expiry task
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Upload has expired",
+        )
+
+    cached_config = await get_cached_config(session, redis_client)
+    if not cached_config:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Configuration not found",
+        )
+    config = cached_config.config
+
+    stored_parts: dict[int, tuple[str, int]] = {}
+    paginator = s3.get_paginator("list_parts")
+    try:
+        async for page in paginator.paginate(
+            Bucket=settings.RUSTFS_BUCKET_NAME,
+            Key=direct_upload.key,
+            UploadId=direct_upload.upload_id,
+        ):
+            for part in page.get("Parts", []):
+                stored_parts[part["PartNumber"]] = (
+                    part["ETag"].strip('"'),
+                    part["Size"],
+                )
+    except ClientError as e:
+        _raise_if_gone(e)
+        raise
+
+    claimed = {part.part_number: part.etag.strip('"') for part in upload_in.parts}
+    part_numbers = sorted(claimed)
+    if not part_numbers or part_numbers != list(range(1, len(part_numbers) + 1)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parts must be numbered consecutively from 1",
+        )
+    for part_number in part_numbers:
+        stored = stored_parts.get(part_number)
+        if stored is None or stored[0] != claimed[part_number]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Part {part_number} is missing or its ETag does not match",
+            )
+        if part_number != part_numbers[-1] and stored[1] < MIN_PART_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Part {part_number} is smaller than the minimum part size",
+            )
+
+    total_size = sum(stored_parts[part_number][1] for part_number in part_numbers)
+    max_file_size_limit = config.max_file_size_limit
+    if total_size > direct_upload.size or (
+        max_file_size_limit is not None and total_size > max_file_size_limit
+    ):
+        # Only the declared size was reserved against the quota
+        await _abort_direct_upload(direct_upload, session, s3, redis_client)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File size exceeds the declared or maximum allowed size",
+        )
+
+    try:
+        await s3.complete_multipart_upload(
+            Bucket=settings.RUSTFS_BUCKET_NAME,
+            Key=direct_upload.key,
+            UploadId=direct_upload.upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": part_number, "ETag": f'"{claimed[part_number]}"'}
+                    for part_number in part_numbers
+                ]
+            },
+        )
+    except ClientError as e:
+        _raise_if_gone(e)
+        raise
+
+    result = await session.exec(
+        delete(DirectUpload).where(DirectUpload.id == direct_upload.id)
+    )
+    if result.rowcount != 1:
+        # Completed by a concurrent request
+        await session.rollback()
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    now = datetime.now(timezone.utc)
+    file_obj = File(
+        filename=direct_upload.filename,
+        size=total_size,
+        expires_at=now + timedelta(seconds=direct_upload.expire_after),
+        expire_after_n_download=direct_upload.expire_after_n_download,
+        created_at=now,
+        key=direct_upload.key,
+    )
+    session.add(file_obj)
+    await session.commit()
+    await session.refresh(file_obj)
+    await cache_file(redis_client, file_obj)
+
+    await commit_reservation(redis_client, direct_upload.key)
+    # Give back the part of the reservation the client did not use
+    await free_storage(redis_client, direct_upload.size - total_size)
+
+    return FileOut(key=direct_upload.key)
+
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_direct_upload(
+    id: uuid.UUID,
+    s3: S3Dep,
+    session: SessionDep,
+    redis_client: RedisDep,
+):
+    direct_upload = await _get_direct_upload(session, id)
+    await _abort_direct_upload(direct_upload, session, s3, redis_client)
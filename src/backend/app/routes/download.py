@@ -1,66 +1,270 @@
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
 from urllib.parse import quote
+from uuid import UUID, uuid4
 
 from botocore.exceptions import ClientError
-from fastapi import APIRouter, BackgroundTasks, HTTPException
-from fastapi.responses import StreamingResponse
-from sqlmodel import select
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from sqlmodel import case, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.deps import S3Dep, SessionDep
+from app.cache.files import cache_file, get_file, invalidate_files
+from app.decorators.rate_limit import rate_limit
+from app.deps import DownloadBandwidthDep, RedisDep, S3Dep, SessionDep
+from app.metrics.registry import ACTIVE_STREAMS
 from app.models.files import File
+from app.security import create_download_token, verify_download_token
 from app.settings import settings
-from app.tasks.clean_file import delete_expired_file
+from app.storage.client import open_presign_client
+from app.storage.quota import free_storage
+from app.tracing.provider import start_span
 
 router = APIRouter()
 
+DOWNLOAD_TOKEN_HEADER = "X-Download-Token"
+
+# Only a single byte range is supported, anything else is served in full
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Takes ARGV[1] bytes from what a download token may still fetch. Returns 1
+# when they fit, 0 when the budget is spent or the token was never issued.
+LUA_SPEND_RESUME_BUDGET = """
+local left = redis.call('GET', KEYS[1])
+if not left or tonumber(left) < tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('DECRBY', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+def _resume_budget_key(token_id: str) -> str:
+    return f"download:resume:{token_id}"
+
+
+def _parse_range(range_header: str | None) -> str | None:
+    """Return the `Range` value to forward to S3, or None to send the whole file."""
+    if not range_header:
+        return None
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    return range_header.strip()
+
+
+def _range_length(byte_range: str, size: int) -> int:
+    """Number of bytes a range from `_parse_range` selects from the file."""
+    start, end = RANGE_PATTERN.match(byte_range).groups()
+    if not start:
+        return min(int(end), size)
+    if not end:
+        return max(size - int(start), 0)
+    return max(min(int(end), size - 1) - int(start) + 1, 0)
+
+
+async def _claim_download(session: AsyncSession, key: str) -> File | None:
+    """
+    Count one download in a single conditional UPDATE.
+
+    The limit and expiry are checked by the database in the same statement
+    that increments the counter, so concurrent downloads can never claim more
+    than `expire_after_n_download` slots between them. The claim that takes
+    the last slot stamps `exhausted_at` for the sweeper.
+    """
+    now = datetime.now(timezone.utc)
+    statement = (
+        update(File)
+        .where(
+            File.key == key,
+            File.download_count < File.expire_after_n_download,
+            File.expires_at > now,
+        )
+        .values(
+            download_count=File.download_count + 1,
+            exhausted_at=case(
+                (File.download_count + 1 >= File.expire_after_n_download, now),
+                else_=File.exhausted_at,
+            ),
+        )
+        .returning(File)
+    )
+    result = await session.exec(statement)
+    file_record = result.scalar_one_or_none()
+    await session.commit()
+    return file_record
+
+
+async def _release_download(session: AsyncSession, file_id: UUID) -> None:
+    """Give back a claimed download that could not be served."""
+    statement = (
+        update(File)
+        .where(File.id == file_id, File.download_count > 0)
+        .values(download_count=File.download_count - 1, exhausted_at=None)
+    )
+    await session.exec(statement)
+    await session.commit()
+
 
 @router.get("/download/{key}")
+@rate_limit(settings.DOWNLOAD_BANDWIDTH_LIMIT)
 async def download_files(
     key: str,
     session: SessionDep,
     s3: S3Dep,
-    background_tasks: BackgroundTasks,
+    redis_client: RedisDep,
+    bandwidth: DownloadBandwidthDep,
+    range_header: Annotated[str | None, Header(alias="Range")] = None,
+    if_range: Annotated[str | None, Header(alias="If-Range")] = None,
+    token: Annotated[str | None, Header(alias=DOWNLOAD_TOKEN_HEADER)] = None,
 ):
-    # Fetch file metadata
-    query = select(File).where(File.key == key)
-    result = await session.exec(query)
-    file_record = result.one_or_none()
-
+    # Cached metadata turns away missing and used up links without a query
+    file_record = await get_file(session, redis_client, key)
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
-    if file_record.is_expired:
-        raise HTTPException(status_code=410, detail="File is expired")
-
-    try:
-        # Get entire file from S3
-        s3_response = await s3.get_object(Bucket=settings.RUSTFS_BUCKET_NAME, Key=key)
-    except ClientError as e:
-        error_code = e.response.get("Error", {}).get("Code")
-        if error_code == "NoSuchKey":
-            raise HTTPException(status_code=404, detail="File not found in storage")
-        raise HTTPException(status_code=500, detail="Storage error")
-
-    # Increment download count immediately
-    file_record.download_count += 1
-    session.add(file_record)
-    await session.commit()
 
-    # Schedule deletion if limit reached (after response is sent)
-    if file_record.download_count >= file_record.expire_after_n_download:
-        background_tasks.add_task(delete_expired_file.delay, str(file_record.id))
+    byte_range = _parse_range(range_header)
+    # If-Range is honoured only in its strong ETag form, with a date the
+    # whole file is sent as RFC 9110 allows
+    if byte_range and if_range is not None and not if_range.startswith('"'):
+        byte_range = None
+
+    # A valid token lets a ranged request continue a download that was
+    # already counted, even if that download exhausted the file. The bytes
+    # come out of that one download's budget, so a token cannot be replayed
+    # to fetch the file again.
+    resuming = False
+    token_id = verify_download_token(token, key) if token else None
+    if token_id and byte_range:
+        resuming = (
+            await redis_client.eval(
+                LUA_SPEND_RESUME_BUDGET,
+                1,
+                _resume_budget_key(token_id),
+                _range_length(byte_range, file_record.size or 0),
+            )
+            == 1
+        )
+
+    if resuming:
+        if datetime.now(timezone.utc) > file_record.expires_at:
+            raise HTTPException(status_code=410, detail="File is expired")
+    else:
+        if file_record.is_expired:
+            raise HTTPException(status_code=410, detail="File is expired")
+
+        file_record = await _claim_download(session, key)
+        if not file_record:
+            # The cached copy was stale, the claim is authoritative
+            await invalidate_files(redis_client, key)
+            raise HTTPException(status_code=410, detail="File is expired")
+        await cache_file(redis_client, file_record)
+
+    safe_filename = quote(file_record.filename)
+    content_disposition = f"attachment; filename*=UTF-8''{safe_filename}"
+
+    s3_response = None
+    if settings.DOWNLOAD_MODE == "stream":
+        get_kwargs = {"Bucket": settings.RUSTFS_BUCKET_NAME, "Key": key}
+        if byte_range:
+            get_kwargs["Range"] = byte_range
+            if if_range is not None:
+                get_kwargs["IfMatch"] = if_range
+
+        try:
+            try:
+                # Get the requested part (or all) of the file from S3
+                s3_response = await s3.get_object(**get_kwargs)
+            except ClientError as e:
+                error_code = e.response.get("Error", {}).get("Code")
+                if error_code != "PreconditionFailed":
+                    raise
+                # The file changed since the client's copy, start over
+                s3_response = await s3.get_object(
+                    Bucket=settings.RUSTFS_BUCKET_NAME, Key=key
+                )
+        except ClientError as e:
+            if not resuming:
+                await _release_download(session, file_record.id)
+                await invalidate_files(redis_client, key)
+            error_code = e.response.get("Error", {}).get("Code")
+            if error_code == "NoSuchKey":
+                raise HTTPException(status_code=404, detail="File not found in storage")
+            if error_code == "InvalidRange":
+                return Response(
+                    status_code=416,
+                    headers={"Content-Range": f"bytes */{file_record.size}"},
+                )
+            raise HTTPException(status_code=500, detail="Storage error")
+
+    headers = {"Content-Disposition": content_disposition}
+    if not resuming:
+        # Resumed requests together may fetch the file once more, a client
+        # picks up where the interrupted request stopped
+        token_id = uuid4().hex
+        await redis_client.set(
+            _resume_budget_key(token_id),
+            file_record.size or 0,
+            ex=settings.DOWNLOAD_RESUME_TTL,
+        )
+        headers[DOWNLOAD_TOKEN_HEADER] = create_download_token(
+            key, token_id, timedelta(seconds=settings.DOWNLOAD_RESUME_TTL)
+        )
+
+        # The sweeper deletes the file once it can no longer be resumed
+        if file_record.download_count >= file_record.expire_after_n_download:
+            # An exhausted file no longer counts towards the storage quota
+            await free_storage(redis_client, file_record.size or 0)
+
+    if settings.DOWNLOAD_MODE == "redirect":
+        # Storage answers Range and conditional requests itself
+        presign_client = await open_presign_client()
+        url = await presign_client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": settings.RUSTFS_BUCKET_NAME,
+                "Key": key,
+                "ResponseContentDisposition": content_disposition,
+            },
+            ExpiresIn=settings.DOWNLOAD_REDIRECT_EXPIRY,
+        )
+        return RedirectResponse(url, status_code=307, headers=headers)
+
+    if settings.DOWNLOAD_MODE == "accel":
+        # The fronting proxy maps this internal location onto the bucket
+        headers[settings.DOWNLOAD_ACCEL_HEADER] = (
+            f"{settings.DOWNLOAD_ACCEL_PREFIX}{settings.RUSTFS_BUCKET_NAME}/{key}"
+        )
+        return Response(status_code=200, headers=headers)
+
+    headers["Accept-Ranges"] = "bytes"
+    headers["Content-Length"] = str(s3_response["ContentLength"])
+    if s3_response.get("ETag"):
+        headers["ETag"] = s3_response["ETag"]
+    content_range = s3_response.get("ContentRange")
+    if content_range:
+        headers["Content-Range"] = content_range
 
     async def stream_file():
+        # Covers the transfer after GetObject returned, until the last byte
+        stream_span = start_span("stream file", attributes={"file.key": key})
+        sent = 0
         try:
-            async for chunk in s3_response["Body"]:
-                yield chunk
+            with ACTIVE_STREAMS.labels("download").track_inprogress():
+                async for chunk in s3_response["Body"]:
+                    await bandwidth.consume(len(chunk))
+                    yield chunk
+                    sent += len(chunk)
         finally:
             s3_response["Body"].close()
+            if stream_span is not None:
+                stream_span.set_attribute("file.bytes_sent", sent)
+                stream_span.end()
 
-    safe_filename = quote(file_record.filename)
     return StreamingResponse(
         stream_file(),
-        status_code=200,
+        status_code=206 if content_range else 200,
         media_type=s3_response.get("ContentType", "application/octet-stream"),
-        headers={
-            "Content-Disposition": f"attachment; filename*=UTF-8''{safe_filename}"
-        },
+        headers=headers,
     )
@@ -1,10 +1,8 @@
-from botocore.exceptions import ClientError
 from fastapi import APIRouter, HTTPException
-from sqlmodel import select
 
-from app.deps import S3Dep, SessionDep
-from app.models.files import File, FileInformationOut
-from app.settings import settings
+from app.cache.files import get_file
+from app.deps import RedisDep, SessionDep
+from app.models.files import FileInformationOut
 
 router = APIRouter()
 
@@ -13,11 +11,9 @@ router = APIRouter()
 async def get_file_information(
     key: str,
     session: SessionDep,
-    s3: S3Dep,
+    redis_client: RedisDep,
 ):
-    query = select(File).where(File.key == key)
-    result = await session.exec(query)
-    file_record = result.one_or_none()
+    file_record = await get_file(session, redis_client, key)
 
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
@@ -25,21 +21,10 @@ async def get_file_information(
     if file_record.is_expired:
         raise HTTPException(status_code=410, detail="File is expired")
 
-    try:
-        s3_response = await s3.head_object(
-            Bucket=settings.RUSTFS_BUCKET_NAME,
-            Key=key,
-        )
-    except ClientError as e:
-        error_code = e.response.get("Error", {}).get("Code")
-        if error_code == "404" or error_code == "NoSuchKey":
-            raise HTTPException(status_code=404, detail="File not found in storage")
-        raise e
-
     return {
         "id": file_record.id,
         "filename": file_record.filename,
-        "size": s3_response.get("ContentLength"),
+        "size": file_record.size,
         "download_count": file_record.download_count,
         "created_at": int(file_record.created_at.timestamp()),
         "expires_at": file_record.expires_at,
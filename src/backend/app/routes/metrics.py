@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+
+from app.metrics.registry import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus scrape endpoint."""
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
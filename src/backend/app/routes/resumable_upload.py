@@ -0,0 +1,398 @@
+import asyncio
+import math
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
+
+from fastapi import APIRouter, Header, HTTPException, Request, Response, status
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError
+from sqlmodel import select, update
+from starlette.requests import ClientDisconnect
+
+from app.cache.config import get_cached_config
+from app.cache.files import cache_file
+from app.decorators.rate_limit import rate_limit
+from app.deps import RedisDep, S3Dep, SessionDep, UploadBandwidthDep
+from app.metrics.registry import ACTIVE_STREAMS
+from app.models.files import File
+from app.models.resumable_upload import (
+    ResumableUpload,
+    ResumableUploadCreate,
+    ResumableUploadOut,
+)
+from app.routes.upload import CHUNK_SIZE, MAX_PARTS_IN_FLIGHT
+from app.settings import settings
+from app.storage.multipart import MultipartPipeline
+from app.storage.quota import commit_reservation, release_reservation, reserve_storage
+
+router = APIRouter(prefix="/upload/resumable")
+
+# S3 limit for multipart uploads
+MAX_PARTS = 10_000
+
+PATCH_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def _offset_headers(resumable: ResumableUpload) -> dict[str, str]:
+    return {
+        "Upload-Offset": str(resumable.offset),
+        "Upload-Length": str(resumable.size),
+        "Cache-Control": "no-store",
+    }
+
+
+async def _get_resumable_upload(session: SessionDep, id: uuid.UUID) -> ResumableUpload:
+    query = select(ResumableUpload).where(ResumableUpload.id == id)
+    result = await session.exec(query)
+    resumable = result.one_or_none()
+    if not resumable:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return resumable
+
+
+async def _keep_lock(lock: Lock, lost: asyncio.Event) -> None:
+    """Extend the lock while the request runs, however slowly data arrives."""
+    while True:
+        await asyncio.sleep(settings.RESUMABLE_UPLOAD_LOCK_TTL / 3)
+        try:
+            await lock.reacquire()
+        except LockError:
+            lost.set()
+            return
+
+
+async def _lock_lost(session: SessionDep, resumable: ResumableUpload) -> HTTPException:
+    """Error for a request that no longer holds the upload, with its offset now."""
+    await session.refresh(resumable)
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Upload was taken over by another request",
+        headers=_offset_headers(resumable),
+    )
+
+
+async def _delete_tail(s3: S3Dep, resumable: ResumableUpload) -> None:
+    if resumable.tail_size:
+        await s3.delete_object(
+            Bucket=settings.RUSTFS_BUCKET_NAME, Key=resumable.tail_key
+        )
+
+
+async def _replace_tail(
+    s3: S3Dep, resumable: ResumableUpload, offset: int, tail: bytes
+) -> None:
+    """Store the bytes past the last full part under the key for `offset`."""
+    if tail:
+        await s3.put_object(
+            Bucket=settings.RUSTFS_BUCKET_NAME,
+            Key=resumable.tail_key_at(offset),
+            Body=tail,
+        )
+
+
+async def _complete(
+    resumable: ResumableUpload,
+    session: SessionDep,
+    s3: S3Dep,
+    redis_client: RedisDep,
+) -> None:
+    """Assemble the parts into the file and replace the upload with a `File`."""
+    parts = []
+    paginator = s3.get_paginator("list_parts")
+    async for page in paginator.paginate(
+        Bucket=settings.RUSTFS_BUCKET_NAME,
+        Key=resumable.key,
+        UploadId=resumable.upload_id,
+    ):
+        for part in page.get("Parts", []):
+            # Parts of an interrupted request may exist past the last counted one
+            if part["PartNumber"] <= resumable.part_count:
+                parts.append({"PartNumber": part["PartNumber"], "ETag": part["ETag"]})
+
+    await s3.complete_multipart_upload(
+        Bucket=settings.RUSTFS_BUCKET_NAME,
+        Key=resumable.key,
+        UploadId=resumable.upload_id,
+        MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])},
+    )
+
+    now = datetime.now(timezone.utc)
+    file_obj = File(
+        filename=resumable.filename,
+        size=resumable.size,
+        expires_at=now + timedelta(seconds=resumable.expire_after),
+        expire_after_n_download=resumable.expire_after_n_download,
+        created_at=now,
+        key=resumable.key,
+    )
+    session.add(file_obj)
+    await session.delete(resumable)
+    await session.commit()
+    await session.refresh(file_obj)
+    await cache_file(redis_client, file_obj)
+    await commit_reservation(redis_client, resumable.key)
+
+
+@router.post("", status_code=status.HTTP_201_CREATED)
+async def create_resumable_upload(
+    upload_in: ResumableUploadCreate,
+    request: Request,
+    response: Response,
+    s3: S3Dep,
+    session: SessionDep,
+    redis_client: RedisDep,
+) -> ResumableUploadOut:
+    """
+    Start an upload whose data is sent with `PATCH` requests.
+
+    The declared size is reserved against the quota up front. The `Location`
+    header points at the upload, `HEAD` on it returns the offset to resume
+    from after a dropped connection.
+    """
+    cached_config = await get_cached_config(session, redis_client)
+    if not cached_config:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Configuration not found",
+        )
+    config = cached_config.config
+
+    if (
+        config.max_file_size_limit is not None
+        and upload_in.size > config.max_file_size_limit
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File size exceeds the maximum allowed limit",
+        )
+
+    key = str(uuid.uuid7())
+    if not await reserve_storage(
+        redis_client, session, key, upload_in.size, config.total_storage_limit
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Storage quota exceeded",
+        )
+
+    content_type = upload_in.content_type or "application/octet-stream"
+    try:
+        resp = await s3.create_multipart_upload(
+            Bucket=settings.RUSTFS_BUCKET_NAME,
+            Key=key,
+            ContentType=content_type,
+        )
+    except Exception:
+        await release_reservation(redis_client, key)
+        raise
+    upload_id = resp["UploadId"]
+
+    now = datetime.now(timezone.utc)
+    resumable = ResumableUpload(
+        key=key,
+        upload_id=upload_id,
+        filename=upload_in.filename or str(uuid.uuid7()),
+        content_type=content_type,
+        size=upload_in.size,
+        part_size=max(CHUNK_SIZE, math.ceil(upload_in.size / MAX_PARTS)),
+        expire_after_n_download=upload_in.expire_after_n_download,
+        expire_after=upload_in.expire_after,
+        created_at=now,
+        expires_at=now + timedelta(seconds=settings.RESUMABLE_UPLOAD_SESSION_TTL),
+    )
+    session.add(resumable)
+    try:
+        await session.commit()
+    except Exception:
+        await s3.abort_multipart_upload(
+            Bucket=settings.RUSTFS_BUCKET_NAME, Key=key, UploadId=upload_id
+        )
+        await release_reservation(redis_client, key)
+        raise
+    await session.refresh(resumable)
+
+    response.headers["Location"] = str(
+        request.url_for("patch_resumable_upload", id=resumable.id)
+    )
+    response.headers.update(_offset_headers(resumable))
+    return ResumableUploadOut.model_validate(resumable, from_attributes=True)
+
+
+@router.head("/{id}")
+async def head_resumable_upload(id: uuid.UUID, session: SessionDep) -> Response:
+    """Report how many bytes were received, the offset to resume from."""
+    resumable = await _get_resumable_upload(session, id)
+    return Response(status_code=200, headers=_offset_headers(resumable))
+
+
+@router.patch("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+@rate_limit(settings.UPLOAD_BANDWIDTH_LIMIT)
+async def patch_resumable_upload(
+    id: uuid.UUID,
+    request: Request,
+    s3: S3Dep,
+    session: SessionDep,
+    redis_client: RedisDep,
+    bandwidth: UploadBandwidthDep,
+    upload_offset: Annotated[int, Header(alias="Upload-Offset", ge=0)],
+    content_type: Annotated[str | None, Header(alias="Content-Type")] = None,
+) -> Response:
+    """
+    Append the request body at `Upload-Offset`.
+
+    Everything received is kept, also when the connection drops halfway, so
+    the client resumes from the offset `HEAD` reports. The request that
+    delivers the last byte turns the upload into a file.
+    """
+    if content_type != PATCH_CONTENT_TYPE:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be {PATCH_CONTENT_TYPE}",
+        )
+
+    # One request appends to an upload at a time
+    lock = Lock(
+        redis_client,
+        f"resumable:{id}:lock",
+        timeout=settings.RESUMABLE_UPLOAD_LOCK_TTL,
+        blocking=False,
+    )
+    if not await lock.acquire():
+        raise HTTPException(
+            status_code=status.HTTP_423_LOCKED,
+            detail="Upload is in use by another request",
+        )
+
+    lock_lost = asyncio.Event()
+    keep_lock = asyncio.create_task(_keep_lock(lock, lock_lost))
+    try:
+        resumable = await _get_resumable_upload(session, id)
+        if upload_offset != resumable.offset:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload-Offset must be {resumable.offset}",
+                headers=_offset_headers(resumable),
+            )
+
+        buffer = bytearray()
+        if resumable.tail_size:
+            tail = await s3.get_object(
+                Bucket=settings.RUSTFS_BUCKET_NAME, Key=resumable.tail_key
+            )
+            async with tail["Body"] as body:
+                buffer += await body.read()
+
+        pipeline = MultipartPipeline(
+            s3=s3,
+            bucket=settings.RUSTFS_BUCKET_NAME,
+            key=resumable.key,
+            upload_id=resumable.upload_id,
+            max_in_flight=MAX_PARTS_IN_FLIGHT,
+        )
+        part_size = resumable.part_size
+        part_count = resumable.part_count
+        received = resumable.offset
+        previous_tail_key = resumable.tail_key
+        previous_tail_size = resumable.tail_size
+        try:
+            try:
+                with ACTIVE_STREAMS.labels("upload").track_inprogress():
+                    async for chunk in request.stream():
+                        if lock_lost.is_set():
+                            raise await _lock_lost(session, resumable)
+                        received += len(chunk)
+                        if received > resumable.size:
+                            raise HTTPException(
+                                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail="Upload exceeds its declared length",
+                            )
+                        await bandwidth.consume(len(chunk))
+
+                        buffer += chunk
+                        while len(buffer) >= part_size:
+                            part_count += 1
+                            await pipeline.submit(part_count, bytes(buffer[:part_size]))
+                            del buffer[:part_size]
+            except ClientDisconnect:
+                # Keep what arrived, the client resumes from there
+                pass
+
+            if received == resumable.size and (buffer or not part_count):
+                # The last part may be short
+                part_count += 1
+                await pipeline.submit(part_count, bytes(buffer))
+                buffer.clear()
+            await pipeline.finish()
+        except Exception:
+            await pipeline.cancel()
+            raise
+
+        # The parts are uploaded, but the offset only moves while the upload is
+        # still ours
+        if lock_lost.is_set() or not await lock.owned():
+            raise await _lock_lost(session, resumable)
+
+        # Without new bytes the buffer is the stored tail
+        if received != resumable.offset:
+            await _replace_tail(s3, resumable, received, bytes(buffer))
+
+        # Only applies on top of the offset this request started from, in
+        # case the lock expired between the check above and here
+        result = await session.exec(
+            update(ResumableUpload)
+            .where(
+                ResumableUpload.id == resumable.id,
+                ResumableUpload.offset == resumable.offset,
+            )
+            .values(
+                offset=received,
+                tail_size=len(buffer),
+                part_count=part_count,
+                expires_at=datetime.now(timezone.utc)
+                + timedelta(seconds=settings.RESUMABLE_UPLOAD_SESSION_TTL),
+            )
+        )
+        await session.commit()
+        if result.rowcount != 1:
+            # The tail written above is not referenced, the orphan reaper
+            # removes it
+            raise await _lock_lost(session, resumable)
+        await session.refresh(resumable)
+
+        # Only dropped once the row points past it
+        if previous_tail_size and resumable.tail_key != previous_tail_key:
+            await s3.delete_object(
+                Bucket=settings.RUSTFS_BUCKET_NAME, Key=previous_tail_key
+            )
+
+        headers = _offset_headers(resumable)
+        if received == resumable.size:
+            await _complete(resumable, session, s3, redis_client)
+        return Response(status_code=status.HTTP_204_NO_CONTENT, headers=headers)
+    finally:
+        keep_lock.cancel()
+        try:
+            await lock.release()
+        except LockError:
+            # Expired while the request was stalled
+            pass
+
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_resumable_upload(
+    id: uuid.UUID,
+    s3: S3Dep,
+    session: SessionDep,
+    redis_client: RedisDep,
+):
+    resumable = await _get_resumable_upload(session, id)
+    await s3.abort_multipart_upload(
+        Bucket=settings.RUSTFS_BUCKET_NAME,
+        Key=resumable.key,
+        UploadId=resumable.upload_id,
+    )
+    await _delete_tail(s3, resumable)
+    await release_reservation(redis_client, resumable.key)
+    await session.delete(resumable)
+    await session.commit()
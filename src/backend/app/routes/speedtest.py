@@ -1,21 +1,150 @@
-import os
-from typing import Annotated, AsyncIterator
-
-from fastapi import APIRouter, Query, Request
-from fastapi.responses import StreamingResponse
-
-from app.schemas.speedtest import UploadPayload
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
+
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+
+from app.decorators.rate_limit import rate_limit
+from app.deps import DownloadBandwidthDep, RedisDep, UploadBandwidthDep
+from app.schemas.speedtest import (
+    SpeedtestResults,
+    SpeedtestSession,
+    SpeedtestSessionCreate,
+    UploadPayload,
+)
 from app.settings import settings
+from app.speedtest.engine import SpeedtestResponse
+from app.speedtest.session import (
+    create_session,
+    get_results,
+    get_stream_count,
+    record_rtts,
+    record_transfer,
+    summarize_rtts,
+)
 
 router = APIRouter()
 
-# 1 MB chunk of random data
-CHUNK_SIZE = 1024 * 1024
-RANDOM_BYTES = os.urandom(CHUNK_SIZE)
+# Smallest chunk a client may ask for, smaller ones only measure the event loop
+MIN_CHUNK_SIZE = 64 * 1024
+
+NO_CACHE_HEADERS = {
+    "Cache-Control": "no-cache, no-store, must-revalidate",
+    "Pragma": "no-cache",
+    "Expires": "0",
+}
+
+SessionQuery = Annotated[
+    uuid.UUID | None,
+    Query(alias="session", description="Session to record this transfer in"),
+]
+StreamQuery = Annotated[
+    int, Query(ge=0, description="Index of the connection within the session")
+]
+
+
+async def _check_stream(
+    redis_client: RedisDep, session_id: uuid.UUID | None, stream: int
+) -> None:
+    if session_id is None:
+        return
+    streams = await get_stream_count(redis_client, session_id)
+    if streams is None:
+        raise HTTPException(status_code=404, detail="Speedtest session not found")
+    if stream >= streams:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Stream must be below {streams}",
+        )
+
+
+@router.post("/speedtest/session", tags=["Speedtest"])
+async def speedtest_create_session(
+    session_in: SpeedtestSessionCreate, redis_client: RedisDep
+) -> SpeedtestSession:
+    """
+    Start a multi-connection test.
+
+    Transfers tagged with the returned id and a stream index are timed and
+    counted by the server, see the results endpoint.
+    """
+    session_id = await create_session(redis_client, session_in.streams)
+    return SpeedtestSession(
+        id=session_id,
+        streams=session_in.streams,
+        expires_at=datetime.now(timezone.utc)
+        + timedelta(seconds=settings.SPEEDTEST_SESSION_TTL),
+    )
+
+
+@router.get("/speedtest/session/{id}", tags=["Speedtest"])
+async def speedtest_results(id: uuid.UUID, redis_client: RedisDep) -> SpeedtestResults:
+    """Per stream and aggregate throughput and latency measured by the server."""
+    results = await get_results(redis_client, id)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Speedtest session not found")
+    return results
+
+
+@router.get(
+    "/speedtest/ping",
+    tags=["Speedtest"],
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def speedtest_ping() -> Response:
+    """Empty response for latency measured by the client."""
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=NO_CACHE_HEADERS)
+
+
+@router.websocket("/speedtest/session/{id}/ping")
+async def speedtest_ping_websocket(
+    websocket: WebSocket, id: uuid.UUID, redis_client: RedisDep
+):
+    """
+    Latency and jitter measured by the server.
+
+    The server sends `{"seq": n}` SPEEDTEST_PING_COUNT times and the client
+    echoes each message back. Round trip times are recorded in the session
+    and summarized in the last message.
+    """
+    if await get_stream_count(redis_client, id) is None:
+        await websocket.close(code=1008, reason="Speedtest session not found")
+        return
+
+    await websocket.accept()
+    rtts: list[float] = []
+    try:
+        for seq in range(settings.SPEEDTEST_PING_COUNT):
+            start = time.perf_counter()
+            await websocket.send_json({"seq": seq})
+            reply = await websocket.receive_json()
+            if reply.get("seq") != seq:
+                await websocket.close(code=1002, reason="Unexpected ping reply")
+                return
+            rtts.append((time.perf_counter() - start) * 1000)
+        await websocket.send_json(summarize_rtts(rtts).model_dump())
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await record_rtts(redis_client, id, rtts)
 
 
 @router.get("/speedtest/download", tags=["Speedtest"])
+@rate_limit(settings.SPEEDTEST_BANDWIDTH_LIMIT)
 async def speedtest_download(
+    bandwidth: DownloadBandwidthDep,
+    redis_client: RedisDep,
     size: Annotated[
         int,
         Query(
@@ -25,48 +154,78 @@ async def speedtest_download(
             le=settings.MAX_DOWNLOAD_SIZE,
         ),
     ] = settings.MAX_DOWNLOAD_SIZE,
-) -> StreamingResponse:
+    chunk_size: Annotated[
+        int,
+        Query(
+            description="Size in bytes of each chunk written to the socket",
+            ge=MIN_CHUNK_SIZE,
+            le=settings.SPEEDTEST_BUFFER_SIZE,
+        ),
+    ] = settings.SPEEDTEST_CHUNK_SIZE,
+    session_id: SessionQuery = None,
+    stream: StreamQuery = 0,
+) -> SpeedtestResponse:
     """
     Download speedtest endpoint.
 
     Streams a requested amount of bytes to measure client download speed.
+    Streams are stateless and share one random buffer, so any number of them
+    can run in parallel.
     """
+    await _check_stream(redis_client, session_id, stream)
 
-    async def iter_content() -> AsyncIterator[bytes]:
-        bytes_remaining: int = size
-
-        while bytes_remaining > 0:
-            yield_size: int = min(CHUNK_SIZE, bytes_remaining)
+    async def on_complete(bytes_sent: int, start: float, end: float):
+        if session_id is not None and bytes_sent:
+            await record_transfer(
+                redis_client, session_id, "download", stream, bytes_sent, start, end
+            )
 
-            if yield_size == CHUNK_SIZE:
-                yield RANDOM_BYTES
-            else:
-                yield RANDOM_BYTES[:yield_size]
+    headers: dict[str, str] = {"Content-Length": str(size), **NO_CACHE_HEADERS}
 
-            bytes_remaining -= yield_size
-
-    headers: dict[str, str] = {
-        "Content-Length": str(size),
-        "Cache-Control": "no-cache, no-store, must-revalidate",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
-
-    return StreamingResponse(
-        iter_content(),
-        media_type="application/octet-stream",
-        headers=headers,
-    )
+    return SpeedtestResponse(size, chunk_size, bandwidth, headers, on_complete)
 
 
 @router.post("/speedtest/upload", tags=["Speedtest"])
-async def speedtest_upload(request: Request):
+@rate_limit(settings.SPEEDTEST_BANDWIDTH_LIMIT)
+async def speedtest_upload(
+    request: Request,
+    bandwidth: UploadBandwidthDep,
+    redis_client: RedisDep,
+    session_id: SessionQuery = None,
+    stream: StreamQuery = 0,
+):
     """
     Upload speedtest endpoint.
-    Reads and discards the request body.
+    Reads and discards the request body, timing it from the first byte.
     """
-    bytes_received = 0
-    async for chunk in request.stream():
-        bytes_received += len(chunk)
+    await _check_stream(redis_client, session_id, stream)
 
-    return UploadPayload(bytes_received=bytes_received)
+    bytes_received = 0
+    started_at = time.time()
+    start = None
+    try:
+        async for chunk in request.stream():
+            if start is None:
+                started_at = time.time()
+                start = time.perf_counter()
+            bytes_received += len(chunk)
+            await bandwidth.consume(len(chunk))
+    finally:
+        seconds = time.perf_counter() - start if start is not None else 0.0
+        if session_id is not None and bytes_received:
+            # Also recorded when the client hangs up early
+            await record_transfer(
+                redis_client,
+                session_id,
+                "upload",
+                stream,
+                bytes_received,
+                started_at,
+                started_at + seconds,
+            )
+
+    return UploadPayload(
+        bytes_received=bytes_received,
+        seconds=seconds,
+        bytes_per_second=bytes_received / seconds if seconds else 0.0,
+    )
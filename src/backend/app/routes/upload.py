@@ -1,16 +1,24 @@
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Annotated
 
-from fastapi import APIRouter, BackgroundTasks, Form, HTTPException, UploadFile, status
-from sqlmodel import select
+from fastapi import APIRouter, HTTPException, Request, status
 
+from app.cache.config import get_cached_config
+from app.cache.files import cache_file
 from app.converter.bytes import ByteSize
-from app.deps import S3Dep, SessionDep
-from app.models.config import Config
+from app.decorators.rate_limit import rate_limit
+from app.deps import RedisDep, S3Dep, SessionDep, UploadBandwidthDep
+from app.metrics.registry import ACTIVE_STREAMS
 from app.models.files import File, FileOut
+from app.parser.multipart import StreamingMultipart
 from app.settings import settings
-from app.tasks.clean_file import delete_expired_file
+from app.storage.multipart import MultipartPipeline
+from app.storage.quota import (
+    commit_reservation,
+    get_storage_used,
+    release_reservation,
+    reserve_storage,
+)
 
 router = APIRouter()
 
@@ -18,58 +26,88 @@ CHUNK_SIZE = ByteSize(
     mb=8  # 8MB (S3 minimum for multipart)
 ).total_bytes()
 
-
-async def _get_current_storage_used(session: SessionDep, s3: S3Dep) -> int:
-    """Sum the sizes (ContentLength) of currently active (non-expired) files."""
-    now = datetime.now(timezone.utc)
-    query = select(File).where(
-        File.expires_at > now, File.download_count < File.expire_after_n_download
-    )
-    result = await session.exec(query)
-    files = result.all()
-
-    total = 0
-    for f in files:
-        try:
-            resp = await s3.head_object(Bucket=settings.RUSTFS_BUCKET_NAME, Key=f.key)
-            total += int(resp.get("ContentLength", 0) or 0)
-        except Exception:
-            # If the object is missing or head fails for any reason, ignore and continue
-            continue
-    return total
+# Room for the form fields and part headers around the file in the body
+MAX_FORM_OVERHEAD = ByteSize(kb=64).total_bytes()
+
+# Parts uploading at once, bounded so one upload stays within its memory budget
+MAX_PARTS_IN_FLIGHT = max(
+    1,
+    min(
+        settings.UPLOAD_MAX_PARTS_IN_FLIGHT,
+        settings.UPLOAD_MEMORY_BUDGET // CHUNK_SIZE,
+    ),
+)
+
+
+# Documents the form parsed by StreamingMultipart, FastAPI never sees it
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file", "expire_after_n_download", "expire_after"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "filename": {"type": "string"},
+                        "expire_after_n_download": {"type": "integer"},
+                        "expire_after": {"type": "integer"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+def _int_field(fields: dict[str, str], name: str) -> int:
+    try:
+        return int(fields[name])
+    except (KeyError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"Form field '{name}' must be an integer",
+        )
 
 
-@router.post("/upload")
+@router.post("/upload", openapi_extra=UPLOAD_REQUEST_BODY)
+@rate_limit(settings.UPLOAD_BANDWIDTH_LIMIT)
 async def upload_file(
-    file: UploadFile,
-    filename: Annotated[str | None, Form()],
-    expire_after_n_download: Annotated[int, Form()],
-    expire_after: Annotated[int, Form()],
+    request: Request,
     # Dependency Injection
     s3: S3Dep,
     session: SessionDep,
-    background_tasks: BackgroundTasks,
+    redis_client: RedisDep,
+    bandwidth: UploadBandwidthDep,
 ) -> FileOut:
-    if not filename:
-        filename = uuid.uuid7()  # type: ignore
-
     key = uuid.uuid7()
 
     # Load the singleton config and determine current usage
-    config_q = select(Config)
-    config_result = await session.exec(config_q)
-    config = config_result.first()
-    if not config:
+    cached_config = await get_cached_config(session, redis_client)
+    if not cached_config:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Configuration not found",
         )
+    config = cached_config.config
 
     total_limit = config.total_storage_limit
     max_file_size_limit = config.max_file_size_limit
-    current_used = 0
+    content_length = request.headers.get("Content-Length")
+    if (
+        max_file_size_limit is not None
+        and content_length is not None
+        and content_length.isdigit()
+        and int(content_length) > max_file_size_limit + MAX_FORM_OVERHEAD
+    ):
+        # Turned away before a single byte of the body is read
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File size exceeds the maximum allowed limit",
+        )
     if total_limit is not None:
-        current_used = await _get_current_storage_used(session, s3)
+        current_used = await get_storage_used(redis_client, session)
         # Quick fail: no space at all left
         if current_used >= total_limit:
             raise HTTPException(
@@ -77,55 +115,84 @@ async def upload_file(
                 detail="Storage quota exceeded",
             )
 
-    resp = await s3.create_multipart_upload(
-        Bucket=settings.RUSTFS_BUCKET_NAME,
-        Key=str(key),
-        ContentType=file.content_type or "application/octet-stream",
-    )
-    upload_id = resp["UploadId"]
-    parts = []
+    form = StreamingMultipart(request)
+    upload_id = None
+    pipeline = None
     part_number = 1
     uploaded_size = 0
+    # Data of the part being assembled, views into the received chunks
+    pending: list[memoryview] = []
+    pending_size = 0
+
+    async def submit_part():
+        nonlocal upload_id, pipeline, part_number, pending, pending_size
+
+        # Reserve quota atomically so concurrent uploads cannot overshoot
+        if not await reserve_storage(
+            redis_client, session, str(key), pending_size, total_limit
+        ):
+            # This will be caught by the outer except block which aborts the multipart upload
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Storage quota exceeded",
+            )
 
-    try:
-        while True:
-            chunk = await file.read(CHUNK_SIZE)
-            if not chunk:
-                break
-
-            # Enforce max file size limit
-            if (
-                max_file_size_limit is not None
-                and uploaded_size + len(chunk) > max_file_size_limit
-            ):
-                raise HTTPException(
-                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    detail="File size exceeds the maximum allowed limit",
-                )
-
-            # Enforce total storage limit incrementally
-            if (
-                total_limit is not None
-                and current_used + uploaded_size + len(chunk) > total_limit
-            ):
-                # This will be caught by the outer except block which aborts the multipart upload
-                raise HTTPException(
-                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    detail="Storage quota exceeded",
-                )
-
-            part = await s3.upload_part(
+        if pipeline is None:
+            # Started with the first part, so bad form fields cost no S3 calls
+            resp = await s3.create_multipart_upload(
                 Bucket=settings.RUSTFS_BUCKET_NAME,
                 Key=str(key),
-                UploadId=upload_id,
-                PartNumber=part_number,
-                Body=chunk,
+                ContentType=form.content_type or "application/octet-stream",
+            )
+            upload_id = resp["UploadId"]
+            pipeline = MultipartPipeline(
+                s3=s3,
+                bucket=settings.RUSTFS_BUCKET_NAME,
+                key=str(key),
+                upload_id=upload_id,
+                max_in_flight=MAX_PARTS_IN_FLIGHT,
             )
 
-            parts.append({"PartNumber": part_number, "ETag": part["ETag"]})
-            part_number += 1
-            uploaded_size += len(chunk)
+        # Returns once a slot is free, the part keeps uploading meanwhile
+        await pipeline.submit(part_number, b"".join(pending))
+        part_number += 1
+        pending = []
+        pending_size = 0
 
+    try:
+        with ACTIVE_STREAMS.labels("upload").track_inprogress():
+            async for data in form.file_chunks():
+                if not uploaded_size:
+                    # Fields sent ahead of the file are checked before its upload
+                    for name in ("expire_after_n_download", "expire_after"):
+                        if name in form.fields:
+                            _int_field(form.fields, name)
+
+                # Enforce max file size limit
+                uploaded_size += len(data)
+                if (
+                    max_file_size_limit is not None
+                    and uploaded_size > max_file_size_limit
+                ):
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="File size exceeds the maximum allowed limit",
+                    )
+                await bandwidth.consume(len(data))
+
+                pending.append(data)
+                pending_size += len(data)
+                if pending_size >= CHUNK_SIZE:
+                    await submit_part()
+
+        expire_after_n_download = _int_field(form.fields, "expire_after_n_download")
+        expire_after = _int_field(form.fields, "expire_after")
+        filename = form.fields.get("filename") or str(uuid.uuid7())
+
+        # The last part may be short, and an empty file is a single empty part
+        if pending_size or pipeline is None:
+            await submit_part()
+        parts = await pipeline.finish()
         await s3.complete_multipart_upload(
             Bucket=settings.RUSTFS_BUCKET_NAME,
             Key=str(key),
@@ -134,15 +201,18 @@ async def upload_file(
         )
 
     except Exception:
-        await s3.abort_multipart_upload(
-            Bucket=settings.RUSTFS_BUCKET_NAME,
-            Key=str(key),
-            UploadId=upload_id,
-        )
+        if pipeline is not None:
+            await pipeline.cancel()
+            await s3.abort_multipart_upload(
+                Bucket=settings.RUSTFS_BUCKET_NAME,
+                Key=str(key),
+                UploadId=upload_id,
+            )
+        await release_reservation(redis_client, str(key))
         raise
     now = datetime.now(timezone.utc)
     file_obj = File(
-        filename=str(filename),
+        filename=filename,
         size=uploaded_size,
         expires_at=now + timedelta(seconds=expire_after),
         expire_after_n_download=expire_after_n_download,
@@ -150,12 +220,13 @@ async def upload_file(
         key=str(key),
     )
     session.add(file_obj)
-    await session.commit()
+    try:
+        await session.commit()
+    except Exception:
+        await release_reservation(redis_client, str(key))
+        raise
     await session.refresh(file_obj)
+    await cache_file(redis_client, file_obj)
+    await commit_reservation(redis_client, str(key))
 
-    background_tasks.add_task(
-        lambda: delete_expired_file.apply_async(
-            (str(file_obj.id),), eta=file_obj.expires_at
-        )
-    )
     return FileOut(key=str(key))
@@ -0,0 +1,48 @@
+from datetime import datetime
+from enum import StrEnum
+
+from pydantic import BaseModel, Field
+
+
+class FileStatus(StrEnum):
+    active = "active"
+    expired = "expired"
+
+
+class FileSort(StrEnum):
+    # ids are uuidv7, so they sort by creation time
+    created = "created"
+    expires_at = "expires_at"
+    size = "size"
+
+
+class SortOrder(StrEnum):
+    asc = "asc"
+    desc = "desc"
+
+
+class FileFilter(BaseModel):
+    status: FileStatus | None = None
+    min_size: int | None = Field(default=None, ge=0)
+    max_size: int | None = Field(default=None, ge=0)
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    filename_prefix: str | None = Field(default=None, min_length=1)
+
+
+class FileListQuery(FileFilter):
+    sort: FileSort = FileSort.created
+    order: SortOrder = SortOrder.asc
+    limit: int = Field(default=100, ge=1, le=1000)
+    # Opaque position returned in `X-Next-Cursor` by the previous page
+    cursor: str | None = None
+
+
+class FileStats(BaseModel):
+    count: int
+    bytes: int
+    active_count: int
+    active_bytes: int
+    expired_count: int
+    expired_bytes: int
+    downloads: int
@@ -1,5 +1,55 @@
-from pydantic import BaseModel
+from datetime import datetime
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+from app.settings import settings
 
 
 class UploadPayload(BaseModel):
     bytes_received: int
+    # Measured by the server from the first to the last byte received
+    seconds: float
+    bytes_per_second: float
+
+
+class SpeedtestSessionCreate(BaseModel):
+    # Parallel connections the client opens per direction
+    streams: int = Field(default=1, ge=1, le=settings.SPEEDTEST_MAX_STREAMS)
+
+
+class SpeedtestSession(BaseModel):
+    id: UUID
+    streams: int
+    expires_at: datetime
+
+
+class StreamResult(BaseModel):
+    stream: int
+    bytes: int
+    # Time the server spent transferring on this stream
+    seconds: float
+    bytes_per_second: float
+
+
+class ThroughputResult(BaseModel):
+    bytes: int
+    # From the first byte of any stream to the last byte of any stream
+    seconds: float
+    bytes_per_second: float
+    streams: list[StreamResult]
+
+
+class LatencyResult(BaseModel):
+    samples: int
+    min_ms: float | None = None
+    avg_ms: float | None = None
+    max_ms: float | None = None
+    jitter_ms: float | None = None
+
+
+class SpeedtestResults(BaseModel):
+    id: UUID
+    download: ThroughputResult | None = None
+    upload: ThroughputResult | None = None
+    latency: LatencyResult
@@ -10,6 +10,7 @@ from app.settings import settings
 password_hash = PasswordHash.recommended()
 
 ALGORITHM = "HS256"
+DOWNLOAD_TOKEN_SCOPE = "download"
 
 
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
@@ -19,6 +20,29 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     return encoded_jwt
 
 
+def create_download_token(key: str, token_id: str, expires_delta: timedelta) -> str:
+    """Token that lets a client resume a download without counting it again."""
+    expire = datetime.now(timezone.utc) + expires_delta
+    to_encode = {
+        "exp": expire,
+        "sub": key,
+        "jti": token_id,
+        "scope": DOWNLOAD_TOKEN_SCOPE,
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+
+def verify_download_token(token: str, key: str) -> str | None:
+    """Return the id of a valid token for `key`, None otherwise."""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+    if payload.get("sub") != key or payload.get("scope") != DOWNLOAD_TOKEN_SCOPE:
+        return None
+    return payload.get("jti")
+
+
 def get_password_hash(password: str) -> str:
     """Hashes a plain text password."""
     return password_hash.hash(password)
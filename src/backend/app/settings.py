@@ -26,13 +26,19 @@ class Settings(BaseSettings):
     # --- SQLite Fields ---
     USE_SQLITE: bool = False
     SQLITE_DB: str = "sql_app.db"
+    # Milliseconds a writer waits for the database lock before failing
+    SQLITE_BUSY_TIMEOUT: int = 5000
+    # Page cache per connection in KiB, and how much of the file is read
+    # through mmap instead of read() calls
+    SQLITE_CACHE_SIZE: int = 64 * 1024
+    SQLITE_MMAP_SIZE: int = ByteSize(mb=256).total_bytes()
 
     @computed_field
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> PostgresDsn | str:
         if self.USE_SQLITE:
             # SQLite uses 3 slashes for a relative path: sqlite:///./filename.db
-            return f"sqlite:///./{self.SQLITE_DB}"
+            return f"sqlite+aiosqlite:///./{self.SQLITE_DB}"
 
         return PostgresDsn.build(
             scheme="postgresql+asyncpg",
@@ -43,6 +49,26 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Database engine, the web app and every Celery worker process each keep
+    # their own pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    CELERY_DB_POOL_SIZE: int = 2
+    CELERY_DB_MAX_OVERFLOW: int = 2
+    # Seconds to wait for a pooled connection when all are in use
+    DB_POOL_TIMEOUT: float = 30
+    # Connections older than this many seconds are replaced, -1 keeps them
+    DB_POOL_RECYCLE: int = 30 * 60
+    # Test connections on checkout, costs a round trip but hides dropped ones
+    DB_POOL_PRE_PING: bool = True
+    # Seconds a single statement may run on PostgreSQL, unset means no limit
+    DB_STATEMENT_TIMEOUT: float | None = 30
+    # Prepared statements cached per connection, 0 when behind pgbouncer in
+    # transaction mode
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Log every statement, only for debugging
+    DB_ECHO: bool = False
+
     # JWT
     SECRET_KEY: str = secrets.token_urlsafe(32)
 
@@ -54,6 +80,16 @@ class Settings(BaseSettings):
     RUSTFS_ACCESS_KEY: str = "rustfsadmin"
     RUSTFS_SECRET_ACCESS_KEY: str = "rustfsadmin"
     RUSTFS_BUCKET_NAME: str = "chithi"
+    # Address browsers use to reach RustFS, if it differs from the one above
+    RUSTFS_PUBLIC_ENDPOINT_URL: str | None = None
+
+    # S3 client pool
+    S3_MAX_POOL_CONNECTIONS: int = 64
+    S3_CONNECT_TIMEOUT: float = 10
+    S3_READ_TIMEOUT: float = 60
+    S3_KEEPALIVE_TIMEOUT: float = 30
+    S3_MAX_ATTEMPTS: int = 3
+    S3_RETRY_MODE: Literal["legacy", "standard", "adaptive"] = "standard"
 
     # Celery Backend
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
@@ -65,10 +101,121 @@ class Settings(BaseSettings):
     # Redis
 
     REDIS_ENDPOINT: str = "redis://localhost:6379/1"
+    REDIS_MAX_CONNECTIONS: int = 64
+    # Seconds to wait for a pooled connection when all are in use
+    REDIS_POOL_TIMEOUT: float = 5
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+
+    # Uploads
+
+    UPLOAD_MAX_PARTS_IN_FLIGHT: int = 4
+    # Upper bound of part bytes a single upload may hold in memory
+    UPLOAD_MEMORY_BUDGET: int = ByteSize(mb=64).total_bytes()
+
+    # Downloads
+
+    # "stream" proxies the object through the backend, "redirect" sends the
+    # client to a presigned URL and "accel" hands the transfer to a fronting
+    # reverse proxy through DOWNLOAD_ACCEL_HEADER
+    DOWNLOAD_MODE: Literal["stream", "redirect", "accel"] = "stream"
+    DOWNLOAD_REDIRECT_EXPIRY: int = 60  # 1 minute
+    # How long a download may be resumed without counting it again
+    DOWNLOAD_RESUME_TTL: int = 60 * 60  # 1 hour
+    DOWNLOAD_ACCEL_HEADER: Literal["X-Accel-Redirect", "X-Sendfile"] = (
+        "X-Accel-Redirect"
+    )
+    DOWNLOAD_ACCEL_PREFIX: str = "/_storage/"
+
+    # Direct (presigned) uploads
+
+    DIRECT_UPLOAD_PART_SIZE: int = ByteSize(mb=16).total_bytes()
+    DIRECT_UPLOAD_URL_EXPIRY: int = 60 * 60  # 1 hour
+    DIRECT_UPLOAD_SESSION_TTL: int = 60 * 60 * 6  # 6 hours
+    DIRECT_UPLOAD_SWEEP_INTERVAL: int = 60 * 15  # 15 minutes
+
+    # Resumable uploads
+
+    # Idle time after which an unfinished resumable upload is aborted
+    RESUMABLE_UPLOAD_SESSION_TTL: int = 60 * 60 * 24  # 1 day
+    RESUMABLE_UPLOAD_SWEEP_INTERVAL: int = 60 * 15  # 15 minutes
+    # A request holding an upload renews its lock while it runs, the lock is
+    # left to expire after this long when the process holding it died
+    RESUMABLE_UPLOAD_LOCK_TTL: int = 60 * 5  # 5 minutes
+
+    # Expiry sweeper
+
+    FILE_SWEEP_INTERVAL: int = 60  # 1 minute
+    FILE_SWEEP_BATCH_SIZE: int = 1000  # DeleteObjects takes at most 1000 keys
+
+    @computed_field
+    @property
+    def FILE_EXHAUSTED_GRACE(self) -> int:
+        # Keep exhausted files while their last download may still be resumed
+        # or fetched through an offloaded download URL
+        return max(self.DOWNLOAD_RESUME_TTL, self.DOWNLOAD_REDIRECT_EXPIRY)
+
+    # Storage accounting
+
+    STORAGE_RECONCILE_INTERVAL: int = 60 * 15  # 15 minutes
+    STORAGE_RESERVATION_TTL: int = 60 * 60 * 24  # 1 day
+    STORAGE_ORPHAN_SWEEP_INTERVAL: int = 60 * 60  # 1 hour
+    # Leftovers younger than this may belong to an upload still in progress
+    STORAGE_ORPHAN_MIN_AGE: int = 60 * 60 * 24  # 1 day
+
+    # Rate limiting
+
+    # Clients remembered per process as blocked, 0 always asks Redis
+    RATE_LIMIT_LOCAL_CACHE_SIZE: int = 10_000
+
+    # Bandwidth limits like "500MB/min", per client unless global, unset means
+    # unlimited. Downloads and the download speedtest share the global limit.
+    UPLOAD_BANDWIDTH_LIMIT: str | None = None
+    DOWNLOAD_BANDWIDTH_LIMIT: str | None = None
+    SPEEDTEST_BANDWIDTH_LIMIT: str | None = None
+    UPLOAD_BANDWIDTH_GLOBAL_LIMIT: str | None = None
+    DOWNLOAD_BANDWIDTH_GLOBAL_LIMIT: str | None = None
+    # Seconds of traffic a stream may send at full speed before being paced
+    BANDWIDTH_BURST: float = 1
+    # Bytes booked against the limits per Redis call
+    BANDWIDTH_QUANTUM: int = ByteSize(mb=1).total_bytes()
+
+    # How often a worker checks whether its cached config is stale
+    CONFIG_CACHE_CHECK_INTERVAL: float = 1
+    # File metadata cache, keyed by share key
+    FILE_CACHE_TTL: int = 60 * 5  # 5 minutes
+    FILE_CACHE_MISSING_TTL: int = 30
 
     # Speedtest
 
     MAX_DOWNLOAD_SIZE: int = ByteSize(gb=30).total_bytes()
+    # Random data every download stream sends slices of
+    SPEEDTEST_BUFFER_SIZE: int = ByteSize(mb=16).total_bytes()
+    SPEEDTEST_CHUNK_SIZE: int = ByteSize(mb=1).total_bytes()
+    # Memory-mapped file holding the random data, created when missing. Lets
+    # servers with the ASGI zero-copy send extension use sendfile.
+    SPEEDTEST_RANDOM_FILE: str | None = None
+    # Multi-connection test sessions
+    SPEEDTEST_SESSION_TTL: int = 60 * 10  # 10 minutes
+    SPEEDTEST_MAX_STREAMS: int = 16
+    SPEEDTEST_PING_COUNT: int = 20
+
+    # Metrics
+    # Serve Prometheus metrics on /metrics and time every request. The
+    # endpoint needs no login, only enable it where /metrics is not reachable
+    # from outside, e.g. blocked at the reverse proxy.
+    METRICS_ENABLED: bool = False
+    # Celery workers serve their metrics on this port, unset disables it
+    CELERY_METRICS_PORT: int | None = 9808
+
+    # Tracing
+    # Export OpenTelemetry spans, needs the `tracing` extra installed
+    TRACING_ENABLED: bool = False
+    # Share of new traces recorded, requests arriving with a trace follow the
+    # caller's decision
+    TRACING_SAMPLE_RATIO: float = 1.0
+    # OTLP/HTTP traces endpoint, unset uses OTEL_EXPORTER_OTLP_* from the
+    # environment or the exporter's default
+    TRACING_OTLP_ENDPOINT: str | None = None
 
 
 settings = Settings()  # type: ignore
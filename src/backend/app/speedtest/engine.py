@@ -0,0 +1,165 @@
+import logging
+import mmap
+import os
+import time
+from dataclasses import dataclass
+from typing import IO, AsyncIterator, Awaitable, Callable
+
+import anyio
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.guards.bandwidth import BandwidthLimiter
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+@dataclass
+class RandomSource:
+    """
+    Random bytes shared read-only by every speedtest stream.
+
+    Streams send slices of one memoryview, so no bytes are copied or
+    allocated per chunk. When backed by a file, the file is memory-mapped and
+    can also be handed to the server for `sendfile`.
+    """
+
+    buffer: memoryview
+    file: IO[bytes] | None = None
+
+
+_source: RandomSource | None = None
+
+
+def _write_random_file(path: str, size: int) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            block = min(remaining, 1024 * 1024)
+            f.write(os.urandom(block))
+            remaining -= block
+    # Other workers may be mapping the file already, never truncate it in place
+    os.replace(tmp_path, path)
+
+
+def get_random_source() -> RandomSource:
+    """Return the process-wide random source, creating it on first use."""
+    global _source
+
+    if _source is None:
+        size = settings.SPEEDTEST_BUFFER_SIZE
+        path = settings.SPEEDTEST_RANDOM_FILE
+        if path:
+            if not os.path.exists(path) or os.path.getsize(path) < size:
+                _write_random_file(path, size)
+            file = open(path, "rb")
+            mapped = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ)
+            _source = RandomSource(buffer=memoryview(mapped), file=file)
+        else:
+            _source = RandomSource(buffer=memoryview(os.urandom(size)))
+    return _source
+
+
+class SpeedtestResponse(StreamingResponse):
+    """
+    Send `size` random bytes in `chunk_size` slices of the random source.
+
+    Uses the ASGI zero-copy send extension when the server offers it and the
+    source is file backed, so the kernel copies straight from the page cache
+    to the socket. Otherwise memoryview slices are sent.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        chunk_size: int,
+        bandwidth: BandwidthLimiter,
+        headers: dict[str, str],
+        on_complete: Callable[[int, float, float], Awaitable[None]] | None = None,
+    ):
+        self.source = get_random_source()
+        self.size = size
+        self.chunk_size = min(chunk_size, len(self.source.buffer))
+        self.bandwidth = bandwidth
+        # Called with the bytes sent and the wall clock start and end, also
+        # when the client hangs up early
+        self.on_complete = on_complete
+        self.bytes_sent = 0
+        self.seconds = 0.0
+        self._zerocopy = False
+        super().__init__(
+            self._iter_chunks(),
+            media_type="application/octet-stream",
+            headers=headers,
+        )
+
+    def _slices(self):
+        buffer_size = len(self.source.buffer)
+        remaining = self.size
+        offset = 0
+        while remaining > 0:
+            count = min(self.chunk_size, remaining, buffer_size - offset)
+            yield offset, count
+            remaining -= count
+            offset = (offset + count) % buffer_size
+
+    async def _iter_chunks(self) -> AsyncIterator[memoryview]:
+        buffer = self.source.buffer
+        for offset, count in self._slices():
+            await self.bandwidth.consume(count)
+            yield buffer[offset : offset + count]
+            self.bytes_sent += count
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        self._zerocopy = (
+            ZEROCOPY_EXTENSION in extensions and self.source.file is not None
+        )
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.seconds = time.perf_counter() - start
+            if self.on_complete is not None:
+                # Still record a transfer cut short by a disconnect
+                with anyio.CancelScope(shield=True):
+                    await self.on_complete(
+                        self.bytes_sent, started_at, started_at + self.seconds
+                    )
+            logger.debug(
+                "Speedtest sent %d bytes in %.3fs (%s)",
+                self.bytes_sent,
+                self.seconds,
+                "sendfile" if self._zerocopy else "memoryview",
+            )
+
+    async def stream_response(self, send: Send) -> None:
+        if not self._zerocopy:
+            await super().stream_response(send)
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        for offset, count in self._slices():
+            await self.bandwidth.consume(count)
+            await send(
+                {
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": self.source.file,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": True,
+                }
+            )
+            self.bytes_sent += count
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,165 @@
+import statistics
+import uuid
+from typing import Literal
+
+from redis.asyncio import Redis
+
+from app.schemas.speedtest import (
+    LatencyResult,
+    SpeedtestResults,
+    StreamResult,
+    ThroughputResult,
+)
+from app.settings import settings
+
+Direction = Literal["download", "upload"]
+
+# Adds one transfer to a stream of a session. ARGV: direction, stream, bytes,
+# busy seconds, start and end as unix timestamps. The start and end of every
+# direction widen to cover all of its transfers.
+LUA_RECORD_TRANSFER = """
+local key = KEYS[1]
+if redis.call('EXISTS', key) == 0 then
+    return 0
+end
+
+local direction = ARGV[1]
+local prefix = direction .. ':' .. ARGV[2]
+redis.call('HINCRBY', key, prefix .. ':bytes', ARGV[3])
+redis.call('HINCRBYFLOAT', key, prefix .. ':seconds', ARGV[4])
+
+local start = tonumber(redis.call('HGET', key, direction .. ':start'))
+if not start or tonumber(ARGV[5]) < start then
+    redis.call('HSET', key, direction .. ':start', ARGV[5])
+end
+local finish = tonumber(redis.call('HGET', key, direction .. ':end'))
+if not finish or tonumber(ARGV[6]) > finish then
+    redis.call('HSET', key, direction .. ':end', ARGV[6])
+end
+return 1
+"""
+
+
+def _session_key(session_id: uuid.UUID) -> str:
+    return f"speedtest:{session_id}"
+
+
+def _rtt_key(session_id: uuid.UUID) -> str:
+    return f"speedtest:{session_id}:rtt"
+
+
+async def create_session(redis_client: Redis, streams: int) -> uuid.UUID:
+    session_id = uuid.uuid7()
+    key = _session_key(session_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, "streams", streams)
+        pipe.expire(key, settings.SPEEDTEST_SESSION_TTL)
+        await pipe.execute()
+    return session_id
+
+
+async def get_stream_count(redis_client: Redis, session_id: uuid.UUID) -> int | None:
+    """Return the number of streams of a live session, None if it is unknown."""
+    streams = await redis_client.hget(_session_key(session_id), "streams")
+    return int(streams) if streams is not None else None
+
+
+async def record_transfer(
+    redis_client: Redis,
+    session_id: uuid.UUID,
+    direction: Direction,
+    stream: int,
+    size: int,
+    start: float,
+    end: float,
+) -> None:
+    await redis_client.eval(
+        LUA_RECORD_TRANSFER,
+        1,
+        _session_key(session_id),
+        direction,
+        stream,
+        size,
+        end - start,
+        start,
+        end,
+    )
+
+
+async def record_rtts(
+    redis_client: Redis, session_id: uuid.UUID, rtts: list[float]
+) -> None:
+    if not rtts:
+        return
+    key = _rtt_key(session_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.rpush(key, *rtts)
+        pipe.expire(key, settings.SPEEDTEST_SESSION_TTL)
+        await pipe.execute()
+
+
+def summarize_rtts(rtts: list[float]) -> LatencyResult:
+    """Latency and jitter, the mean difference between consecutive samples."""
+    if not rtts:
+        return LatencyResult(samples=0)
+    jitter = (
+        statistics.fmean(abs(b - a) for a, b in zip(rtts, rtts[1:]))
+        if len(rtts) > 1
+        else 0.0
+    )
+    return LatencyResult(
+        samples=len(rtts),
+        min_ms=min(rtts),
+        avg_ms=statistics.fmean(rtts),
+        max_ms=max(rtts),
+        jitter_ms=jitter,
+    )
+
+
+async def get_results(
+    redis_client: Redis, session_id: uuid.UUID
+) -> SpeedtestResults | None:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hgetall(_session_key(session_id))
+        pipe.lrange(_rtt_key(session_id), 0, -1)
+        fields, rtts = await pipe.execute()
+    if not fields:
+        return None
+
+    directions: dict[str, ThroughputResult] = {}
+    for direction in ("download", "upload"):
+        streams = []
+        for stream in range(int(fields["streams"])):
+            prefix = f"{direction}:{stream}"
+            size = int(fields.get(f"{prefix}:bytes", 0))
+            seconds = float(fields.get(f"{prefix}:seconds", 0))
+            if size:
+                streams.append(
+                    StreamResult(
+                        stream=stream,
+                        bytes=size,
+                        seconds=seconds,
+                        bytes_per_second=size / seconds if seconds else 0.0,
+                    )
+                )
+        if not streams:
+            continue
+
+        # Streams overlap, so the aggregate rate spans the first to last byte
+        size = sum(stream.bytes for stream in streams)
+        seconds = float(fields[f"{direction}:end"]) - float(
+            fields[f"{direction}:start"]
+        )
+        directions[direction] = ThroughputResult(
+            bytes=size,
+            seconds=seconds,
+            bytes_per_second=size / seconds if seconds else 0.0,
+            streams=streams,
+        )
+
+    return SpeedtestResults(
+        id=session_id,
+        download=directions.get("download"),
+        upload=directions.get("upload"),
+        latency=summarize_rtts([float(rtt) for rtt in rtts]),
+    )
@@ -0,0 +1,120 @@
+import asyncio
+from contextlib import AsyncExitStack
+
+import aioboto3
+from aiobotocore.config import AioConfig
+from botocore.exceptions import ClientError
+from types_aiobotocore_s3 import S3Client
+
+from app.metrics.s3 import instrument_s3_client
+from app.settings import settings
+from app.tracing.s3 import trace_s3_client
+
+_session = aioboto3.Session()
+_lock = asyncio.Lock()
+_exit_stack: AsyncExitStack | None = None
+_client: S3Client | None = None
+_presign_client: S3Client | None = None
+
+
+def _client_config() -> AioConfig:
+    return AioConfig(
+        max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+        connect_timeout=settings.S3_CONNECT_TIMEOUT,
+        read_timeout=settings.S3_READ_TIMEOUT,
+        tcp_keepalive=True,
+        connector_args={"keepalive_timeout": settings.S3_KEEPALIVE_TIMEOUT},
+        retries={
+            "max_attempts": settings.S3_MAX_ATTEMPTS,
+            "mode": settings.S3_RETRY_MODE,
+        },
+    )
+
+
+async def _ensure_bucket(client: S3Client) -> None:
+    try:
+        await client.head_bucket(Bucket=settings.RUSTFS_BUCKET_NAME)
+    except ClientError:
+        await client.create_bucket(Bucket=settings.RUSTFS_BUCKET_NAME)
+
+
+async def open_s3_client() -> S3Client:
+    """
+    Return the process-wide S3 client, creating it on first use.
+
+    The client owns a pooled aiohttp connector, so every request and task in
+    the process reuses warm connections. The bucket is bootstrapped once here
+    instead of on every request.
+    """
+    global _exit_stack, _client
+
+    if _client is not None:
+        return _client
+
+    async with _lock:
+        if _client is None:
+            exit_stack = AsyncExitStack()
+            client = await exit_stack.enter_async_context(
+                _session.client(
+                    "s3",
+                    endpoint_url=settings.RUSTFS_ENDPOINT_URL,  # RustFS S3 API
+                    aws_access_key_id=settings.RUSTFS_ACCESS_KEY,
+                    aws_secret_access_key=settings.RUSTFS_SECRET_ACCESS_KEY,
+                    config=_client_config(),
+                )
+            )
+            instrument_s3_client(client)
+            trace_s3_client(client)
+            try:
+                await _ensure_bucket(client)
+            except Exception:
+                await exit_stack.aclose()
+                raise
+            _exit_stack, _client = exit_stack, client
+
+    return _client
+
+
+async def open_presign_client() -> S3Client:
+    """
+    Return a client that signs URLs handed out to browsers.
+
+    When RustFS is reachable under a different public address than the one
+    the backend uses, URLs must be signed for that public host. Signing is a
+    local operation, so this client never opens a connection itself.
+    """
+    global _presign_client
+
+    client = await open_s3_client()
+    if not settings.RUSTFS_PUBLIC_ENDPOINT_URL:
+        return client
+
+    async with _lock:
+        if _presign_client is None and _exit_stack is not None:
+            _presign_client = await _exit_stack.enter_async_context(
+                _session.client(
+                    "s3",
+                    endpoint_url=settings.RUSTFS_PUBLIC_ENDPOINT_URL,
+                    aws_access_key_id=settings.RUSTFS_ACCESS_KEY,
+                    aws_secret_access_key=settings.RUSTFS_SECRET_ACCESS_KEY,
+                    config=_client_config(),
+                )
+            )
+    return _presign_client or client
+
+
+async def close_s3_client() -> None:
+    global _exit_stack, _client, _presign_client
+
+    async with _lock:
+        if _exit_stack is not None:
+            await _exit_stack.aclose()
+        _exit_stack, _client, _presign_client = None, None, None
+
+
+def forget_s3_client() -> None:
+    """Drop a client inherited from a parent process without closing it."""
+    global _lock, _exit_stack, _client, _presign_client
+
+    _lock = asyncio.Lock()
+    _exit_stack, _client, _presign_client = None, None, None
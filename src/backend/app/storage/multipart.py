@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from botocore.exceptions import ClientError
+from types_aiobotocore_s3 import S3Client
+
+logger = logging.getLogger(__name__)
+
+
+async def abort_multipart_upload(
+    s3: S3Client, bucket: str, key: str, upload_id: str
+) -> bool:
+    """
+    Abort an unfinished multipart upload and tell whether it is gone.
+
+    An upload that was already aborted or completed counts as gone, other
+    failures are logged and leave it in place.
+    """
+    try:
+        await s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+    except ClientError as e:
+        error_code = e.response.get("Error", {}).get("Code")
+        if error_code != "NoSuchUpload":
+            logger.warning("Could not abort %s: %s", upload_id, e)
+            return False
+    return True
+
+
+@dataclass
+class PartTiming:
+    part_number: int
+    size: int
+    seconds: float
+
+
+@dataclass
+class MultipartPipeline:
+    """
+    Upload parts of an S3 multipart upload concurrently.
+
+    `submit` only waits while `max_in_flight` parts are already uploading, so
+    the caller can read the next chunk while earlier parts are written to S3.
+    Each in-flight part holds its chunk in memory, so `max_in_flight` bounds
+    the memory used by a single upload.
+    """
+
+    s3: S3Client
+    bucket: str
+    key: str
+    upload_id: str
+    max_in_flight: int
+
+    timings: list[PartTiming] = field(default_factory=list)
+    _parts: dict[int, str] = field(default_factory=dict, init=False)
+    _tasks: set[asyncio.Task] = field(default_factory=set, init=False)
+    _error: BaseException | None = field(default=None, init=False)
+
+    def __post_init__(self):
+        self._slots = asyncio.Semaphore(max(1, self.max_in_flight))
+
+    async def submit(self, part_number: int, chunk: bytes) -> None:
+        """Schedule a part, raising the first failure of an earlier part."""
+        self._raise_on_error()
+        await self._slots.acquire()
+        self._raise_on_error(release=True)
+
+        task = asyncio.create_task(self._upload_part(part_number, chunk))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def finish(self) -> list[dict]:
+        """Wait for every part and return them ready for completion."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._raise_on_error()
+
+        total = sum(t.seconds for t in self.timings)
+        logger.debug(
+            "Uploaded %d parts of %s in %.3fs of S3 time",
+            len(self.timings),
+            self.key,
+            total,
+        )
+        return [
+            {"PartNumber": number, "ETag": etag}
+            for number, etag in sorted(self._parts.items())
+        ]
+
+    async def cancel(self) -> None:
+        """Stop every in-flight part, used before aborting the upload."""
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _upload_part(self, part_number: int, chunk: bytes) -> None:
+        start = time.perf_counter()
+        try:
+            part = await self.s3.upload_part(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=chunk,
+            )
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+            return
+        finally:
+            self._slots.release()
+
+        elapsed = time.perf_counter() - start
+        self._parts[part_number] = part["ETag"]
+        self.timings.append(PartTiming(part_number, len(chunk), elapsed))
+        logger.debug(
+            "Uploaded part %d of %s (%d bytes) in %.3fs",
+            part_number,
+            self.key,
+            len(chunk),
+            elapsed,
+        )
+
+    def _raise_on_error(self, release: bool = False) -> None:
+        if self._error is None:
+            return
+        if release:
+            self._slots.release()
+        raise self._error
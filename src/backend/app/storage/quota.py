@@ -0,0 +1,155 @@
+import time
+
+from redis.asyncio import Redis
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.metrics.registry import QUOTA_RESERVE_DURATION
+from app.models.files import File
+
+# Bytes held by live (not download-exhausted) files plus in-flight uploads
+USED_KEY = "storage:used"
+# upload id -> bytes reserved so far
+RESERVATIONS_KEY = "storage:reservations"
+# upload id -> unix time the reservation was opened
+RESERVATION_STARTED_KEY = "storage:reservations:started"
+
+# Returns -1 when the counter is not seeded yet, 0 when the quota would be
+# exceeded and 1 when the bytes were reserved. A negative limit means unlimited.
+LUA_RESERVE = """
+local used = redis.call('GET', KEYS[1])
+if not used then
+    return -1
+end
+
+local amount = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+if limit >= 0 and tonumber(used) + amount > limit then
+    return 0
+end
+
+redis.call('INCRBY', KEYS[1], amount)
+redis.call('HINCRBY', KEYS[2], ARGV[1], amount)
+redis.call('ZADD', KEYS[3], 'NX', ARGV[4], ARGV[1])
+return 1
+"""
+
+LUA_RELEASE_RESERVATION = """
+local reserved = tonumber(redis.call('HGET', KEYS[2], ARGV[1]) or '0')
+if reserved > 0 and redis.call('EXISTS', KEYS[1]) == 1 then
+    if redis.call('DECRBY', KEYS[1], reserved) < 0 then
+        redis.call('SET', KEYS[1], 0)
+    end
+end
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('ZREM', KEYS[3], ARGV[1])
+return reserved
+"""
+
+LUA_FREE = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+if redis.call('DECRBY', KEYS[1], ARGV[1]) < 0 then
+    redis.call('SET', KEYS[1], 0)
+end
+return 1
+"""
+
+LUA_RECONCILE = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], 0, ARGV[2])
+for _, upload_id in ipairs(stale) do
+    redis.call('HDEL', KEYS[2], upload_id)
+    redis.call('ZREM', KEYS[3], upload_id)
+end
+
+local total = tonumber(ARGV[1])
+for _, reserved in ipairs(redis.call('HVALS', KEYS[2])) do
+    total = total + tonumber(reserved)
+end
+
+local previous = tonumber(redis.call('GET', KEYS[1]) or '0')
+redis.call('SET', KEYS[1], total)
+return total - previous
+"""
+
+_KEYS = (USED_KEY, RESERVATIONS_KEY, RESERVATION_STARTED_KEY)
+
+
+def live_files_filter():
+    """Rows whose bytes count towards the storage quota."""
+    return File.download_count < File.expire_after_n_download
+
+
+async def compute_storage_used(session: AsyncSession) -> int:
+    """Sum `File.size` of every live file straight from the database."""
+    statement = select(func.coalesce(func.sum(File.size), 0)).where(live_files_filter())
+    result = await session.exec(statement)
+    return int(result.one())
+
+
+async def get_storage_used(redis_client: Redis, session: AsyncSession) -> int:
+    """Return the running counter, seeding it from the database when missing."""
+    used = await redis_client.get(USED_KEY)
+    if used is not None:
+        return int(used)
+
+    total = await compute_storage_used(session)
+    # Another worker may have seeded the counter in the meantime, keep theirs
+    await redis_client.set(USED_KEY, total, nx=True)
+    return int(await redis_client.get(USED_KEY) or total)
+
+
+async def reserve_storage(
+    redis_client: Redis,
+    session: AsyncSession,
+    upload_id: str,
+    amount: int,
+    limit: int | None,
+) -> bool:
+    """Atomically reserve `amount` bytes for an upload if the quota allows it."""
+    with QUOTA_RESERVE_DURATION.time():
+        args = (upload_id, amount, -1 if limit is None else limit, time.time())
+        allowed = await redis_client.eval(LUA_RESERVE, len(_KEYS), *_KEYS, *args)
+        if allowed == -1:
+            await get_storage_used(redis_client, session)
+            allowed = await redis_client.eval(LUA_RESERVE, len(_KEYS), *_KEYS, *args)
+    return allowed == 1
+
+
+async def commit_reservation(redis_client: Redis, upload_id: str) -> None:
+    """Keep the reserved bytes in the counter now that the file row exists."""
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hdel(RESERVATIONS_KEY, upload_id)
+        pipe.zrem(RESERVATION_STARTED_KEY, upload_id)
+        await pipe.execute()
+
+
+async def release_reservation(redis_client: Redis, upload_id: str) -> int:
+    """Give back every byte reserved by a failed or aborted upload."""
+    released = await redis_client.eval(
+        LUA_RELEASE_RESERVATION, len(_KEYS), *_KEYS, upload_id
+    )
+    return int(released)
+
+
+async def free_storage(redis_client: Redis, amount: int) -> None:
+    """Subtract bytes of a file that stopped counting towards the quota."""
+    if amount <= 0:
+        return
+    await redis_client.eval(LUA_FREE, 1, USED_KEY, amount)
+
+
+async def reconcile_storage(
+    redis_client: Redis, actual: int, reservation_ttl: int
+) -> int:
+    """
+    Overwrite the counter with `actual` plus open reservations.
+
+    Reservations older than `reservation_ttl` seconds are considered leaked by
+    a crashed worker and dropped. Returns the drift that was corrected.
+    """
+    cutoff = time.time() - reservation_ttl
+    drift = await redis_client.eval(LUA_RECONCILE, len(_KEYS), *_KEYS, actual, cutoff)
+    return int(drift)
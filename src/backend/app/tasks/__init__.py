@@ -1 +1,10 @@
-from .clean_file import delete_expired_file as delete_expired_file
+from .clean_file import (
+    delete_expired_file as delete_expired_file,
+    sweep_expired_files as sweep_expired_files,
+)
+from .expire_direct_uploads import expire_direct_uploads as expire_direct_uploads
+from .expire_resumable_uploads import (
+    expire_resumable_uploads as expire_resumable_uploads,
+)
+from .reap_orphans import reap_orphaned_storage as reap_orphaned_storage
+from .reconcile_storage import reconcile_storage_usage as reconcile_storage_usage
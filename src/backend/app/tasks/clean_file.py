@@ -1,48 +1,158 @@
-from datetime import datetime, timezone
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Sequence
 
-from sqlmodel import or_, select
+from redis.asyncio import Redis
+from sqlmodel import col, delete, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from types_aiobotocore_s3 import S3Client
 
+from app.cache.files import invalidate_files
 from app.celery import celery
 from app.db import AsyncSessionLocal
-from app.deps import get_s3_client
+from app.deps import get_redis, get_s3_client
+from app.metrics.registry import DELETED_BYTES, DELETED_FILES
 from app.models.files import File
 from app.settings import settings
+from app.storage.quota import free_storage
+
+logger = logging.getLogger(__name__)
+
+# Most keys S3 accepts in a single DeleteObjects request
+DELETE_OBJECTS_MAX_KEYS = 1000
+
+
+async def _delete_files(
+    session: AsyncSession,
+    s3_client: S3Client,
+    redis_client: Redis,
+    files_to_delete: Sequence[File],
+) -> int:
+    """
+    Remove up to DELETE_OBJECTS_MAX_KEYS files with one `DeleteObjects` call.
+
+    Only rows whose object storage reports as removed are deleted, the rest
+    stay for the next sweep. Commits and returns the number of files removed.
+    """
+    start = time.perf_counter()
+    response = await s3_client.delete_objects(
+        Bucket=settings.RUSTFS_BUCKET_NAME,
+        Delete={
+            "Objects": [{"Key": file_obj.key} for file_obj in files_to_delete],
+            # Only failures are listed in the response
+            "Quiet": True,
+        },
+    )
+    s3_seconds = time.perf_counter() - start
+
+    errors = response.get("Errors", [])
+    failed_keys = {error["Key"] for error in errors}
+    for error in errors:
+        logger.warning(
+            "Could not delete %s: %s %s",
+            error["Key"],
+            error.get("Code"),
+            error.get("Message"),
+        )
+
+    deleted = [
+        file_obj for file_obj in files_to_delete if file_obj.key not in failed_keys
+    ]
+    if deleted:
+        start = time.perf_counter()
+        await session.exec(
+            delete(File).where(col(File.id).in_([file_obj.id for file_obj in deleted]))
+        )
+        await session.commit()
+        db_seconds = time.perf_counter() - start
+
+        # Exhausted files were already taken off the quota by their last download
+        freed = sum(
+            file_obj.size or 0 for file_obj in deleted if file_obj.exhausted_at is None
+        )
+        await free_storage(redis_client, freed)
+        await invalidate_files(redis_client, *(file_obj.key for file_obj in deleted))
+        DELETED_FILES.inc(len(deleted))
+        DELETED_BYTES.inc(sum(file_obj.size or 0 for file_obj in deleted))
+    else:
+        await session.commit()
+        db_seconds = 0.0
+
+    logger.info(
+        "Deleted %d of %d files (%d failed) in %.3fs of S3 and %.3fs of DB time",
+        len(deleted),
+        len(files_to_delete),
+        len(failed_keys),
+        s3_seconds,
+        db_seconds,
+    )
+    return len(deleted)
 
 
 @celery.task
 async def delete_expired_file(file_id: str):
+    """Delete a single file right away, e.g. on request of an admin."""
     async with AsyncSessionLocal() as session:
-        now = datetime.now(timezone.utc)
-
-        statement = select(File).where(
-            or_(
-                File.id == file_id,
-                File.download_count >= File.expire_after_n_download,
-                File.expires_at < now,
-            )
-        )
+        statement = select(File).where(File.id == file_id).with_for_update()
         result = await session.exec(statement)
         files_to_delete = result.all()
 
         if not files_to_delete:
             return "No files found to delete."
 
-        # Process deletions
         async for s3_client in get_s3_client():
-            for file_obj in files_to_delete:
-                try:
-                    # Remove from S3
-                    await s3_client.delete_object(
-                        Bucket=settings.RUSTFS_BUCKET_NAME,
-                        Key=file_obj.key,
+            async for redis_client in get_redis():
+                deleted = await _delete_files(
+                    session, s3_client, redis_client, files_to_delete
+                )
+
+        return f"Processed {deleted} deletions."
+
+
+@celery.task
+async def sweep_expired_files():
+    """
+    Delete expired and exhausted files in batches.
+
+    Rows are found through the `expires_at` index and the partial index on
+    `exhausted_at`. Exhausted files are kept for FILE_EXHAUSTED_GRACE so the
+    last download can still be resumed. Each batch is locked with
+    `SKIP LOCKED`, so several workers can sweep at once without deleting the
+    same file twice, and is removed with a single `DeleteObjects` call.
+    """
+    batch_size = min(settings.FILE_SWEEP_BATCH_SIZE, DELETE_OBJECTS_MAX_KEYS)
+    deleted = 0
+    async for s3_client in get_s3_client():
+        async for redis_client in get_redis():
+            while True:
+                async with AsyncSessionLocal() as session:
+                    now = datetime.now(timezone.utc)
+                    exhausted_before = now - timedelta(
+                        seconds=settings.FILE_EXHAUSTED_GRACE
                     )
-                    # Remove from Session
-                    await session.delete(file_obj)
-                except Exception as e:
-                    # If one file fails (e.g. S3 404), continue to others
-                    print(f"Excetpion raised while deleting: {e}")
-                    continue
-
-        # Commit all changes
-        await session.commit()
-        return f"Processed {len(files_to_delete)} deletions."
+                    statement = (
+                        select(File)
+                        .where(
+                            or_(
+                                File.expires_at < now,
+                                File.exhausted_at < exhausted_before,
+                            )
+                        )
+                        .limit(batch_size)
+                        .with_for_update(skip_locked=True)
+                    )
+                    result = await session.exec(statement)
+                    batch = result.all()
+                    if not batch:
+                        break
+
+                    batch_deleted = await _delete_files(
+                        session, s3_client, redis_client, batch
+                    )
+                    deleted += batch_deleted
+                    # Every file of the batch failed, retry on the next run
+                    if batch_deleted == 0:
+                        break
+
+    return f"Swept {deleted} files."
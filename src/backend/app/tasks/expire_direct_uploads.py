@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+from sqlmodel import select
+
+from app.celery import celery
+from app.db import AsyncSessionLocal
+from app.deps import get_redis, get_s3_client
+from app.models.direct_upload import DirectUpload
+from app.settings import settings
+from app.storage.multipart import abort_multipart_upload
+from app.storage.quota import release_reservation
+
+
+@celery.task
+async def expire_direct_uploads():
+    """Abort presigned uploads the client never completed."""
+    async with AsyncSessionLocal() as session:
+        now = datetime.now(timezone.utc)
+        statement = select(DirectUpload).where(DirectUpload.expires_at < now)
+        result = await session.exec(statement)
+        abandoned = result.all()
+
+        if not abandoned:
+            return "No abandoned uploads found."
+
+        async for s3_client in get_s3_client():
+            async for redis_client in get_redis():
+                for direct_upload in abandoned:
+                    if not await abort_multipart_upload(
+                        s3_client,
+                        settings.RUSTFS_BUCKET_NAME,
+                        direct_upload.key,
+                        direct_upload.upload_id,
+                    ):
+                        continue
+
+                    await release_reservation(redis_client, direct_upload.key)
+                    await session.delete(direct_upload)
+
+        await session.commit()
+        return f"Aborted {len(abandoned)} abandoned uploads."
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+from sqlmodel import select
+
+from app.celery import celery
+from app.db import AsyncSessionLocal
+from app.deps import get_redis, get_s3_client
+from app.models.resumable_upload import ResumableUpload
+from app.settings import settings
+from app.storage.multipart import abort_multipart_upload
+from app.storage.quota import release_reservation
+
+
+@celery.task
+async def expire_resumable_uploads():
+    """Abort resumable uploads that saw no request for a whole session TTL."""
+    async with AsyncSessionLocal() as session:
+        now = datetime.now(timezone.utc)
+        statement = select(ResumableUpload).where(ResumableUpload.expires_at < now)
+        result = await session.exec(statement)
+        abandoned = result.all()
+
+        if not abandoned:
+            return "No abandoned uploads found."
+
+        async for s3_client in get_s3_client():
+            async for redis_client in get_redis():
+                for resumable in abandoned:
+                    if not await abort_multipart_upload(
+                        s3_client,
+                        settings.RUSTFS_BUCKET_NAME,
+                        resumable.key,
+                        resumable.upload_id,
+                    ):
+                        continue
+
+                    if resumable.tail_size:
+                        await s3_client.delete_object(
+                            Bucket=settings.RUSTFS_BUCKET_NAME, Key=resumable.tail_key
+                        )
+                    await release_reservation(redis_client, resumable.key)
+                    await session.delete(resumable)
+
+        await session.commit()
+        return f"Aborted {len(abandoned)} abandoned uploads."
@@ -0,0 +1,162 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from botocore.exceptions import ClientError
+from sqlmodel import col, delete, select
+from types_aiobotocore_s3 import S3Client
+
+from app.cache.files import invalidate_files
+from app.celery import celery
+from app.db import AsyncSessionLocal
+from app.deps import get_redis, get_s3_client
+from app.models.direct_upload import DirectUpload
+from app.models.files import File
+from app.models.resumable_upload import ResumableUpload
+from app.settings import settings
+from app.storage.quota import free_storage, release_reservation
+from app.tasks.clean_file import DELETE_OBJECTS_MAX_KEYS
+
+logger = logging.getLogger(__name__)
+
+
+async def _multipart_size(s3_client: S3Client, key: str, upload_id: str) -> int:
+    """Bytes held by the parts of an unfinished multipart upload."""
+    size = 0
+    paginator = s3_client.get_paginator("list_parts")
+    async for page in paginator.paginate(
+        Bucket=settings.RUSTFS_BUCKET_NAME, Key=key, UploadId=upload_id
+    ):
+        size += sum(part["Size"] for part in page.get("Parts", []))
+    return size
+
+
+async def _delete_objects(s3_client: S3Client, objects: dict[str, int]) -> int:
+    """Delete objects in DeleteObjects batches and return the bytes removed."""
+    reclaimed = 0
+    keys = list(objects)
+    for i in range(0, len(keys), DELETE_OBJECTS_MAX_KEYS):
+        batch = keys[i : i + DELETE_OBJECTS_MAX_KEYS]
+        response = await s3_client.delete_objects(
+            Bucket=settings.RUSTFS_BUCKET_NAME,
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+        )
+        failed_keys = {error["Key"] for error in response.get("Errors", [])}
+        reclaimed += sum(objects[key] for key in batch if key not in failed_keys)
+    return reclaimed
+
+
+@celery.task
+async def reap_orphaned_storage():
+    """
+    Bring the bucket and the database back in line with each other.
+
+    - Multipart uploads left behind by a crashed upload are aborted.
+    - Objects without a `File` row are deleted from the bucket.
+    - `File` rows whose object is gone are deleted from the database.
+
+    Only uploads, objects and rows older than STORAGE_ORPHAN_MIN_AGE are
+    touched, so uploads that are still finishing are left alone.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.STORAGE_ORPHAN_MIN_AGE
+    )
+
+    async with AsyncSessionLocal() as session:
+        result = await session.exec(select(File.key))
+        file_keys = set(result.all())
+        result = await session.exec(select(DirectUpload.upload_id))
+        pending_upload_ids = set(result.all())
+        result = await session.exec(select(ResumableUpload))
+        for resumable in result.all():
+            pending_upload_ids.add(resumable.upload_id)
+            # Received bytes waiting for the rest of their part
+            file_keys.add(resumable.tail_key)
+
+    aborted_uploads = 0
+    reclaimed_uploads = 0
+    orphaned_objects: dict[str, int] = {}
+    bucket_keys: set[str] = set()
+
+    async for s3_client in get_s3_client():
+        async for redis_client in get_redis():
+            # Unfinished multipart uploads, presigned and resumable ones expire
+            # on their own
+            paginator = s3_client.get_paginator("list_multipart_uploads")
+            async for page in paginator.paginate(Bucket=settings.RUSTFS_BUCKET_NAME):
+                for upload in page.get("Uploads", []):
+                    upload_id = upload["UploadId"]
+                    if upload["Initiated"] >= cutoff or upload_id in pending_upload_ids:
+                        continue
+
+                    try:
+                        size = await _multipart_size(
+                            s3_client, upload["Key"], upload_id
+                        )
+                        await s3_client.abort_multipart_upload(
+                            Bucket=settings.RUSTFS_BUCKET_NAME,
+                            Key=upload["Key"],
+                            UploadId=upload_id,
+                        )
+                    except ClientError as e:
+                        error_code = e.response.get("Error", {}).get("Code")
+                        # Completed or aborted since it was listed
+                        if error_code != "NoSuchUpload":
+                            logger.warning("Could not abort %s: %s", upload_id, e)
+                        continue
+
+                    # Uploads reserve quota under the key of their file
+                    await release_reservation(redis_client, upload["Key"])
+                    aborted_uploads += 1
+                    reclaimed_uploads += size
+
+            # Objects the database does not know about
+            paginator = s3_client.get_paginator("list_objects_v2")
+            async for page in paginator.paginate(Bucket=settings.RUSTFS_BUCKET_NAME):
+                for obj in page.get("Contents", []):
+                    bucket_keys.add(obj["Key"])
+                    if obj["Key"] not in file_keys and obj["LastModified"] < cutoff:
+                        orphaned_objects[obj["Key"]] = obj["Size"]
+
+            reclaimed_objects = await _delete_objects(s3_client, orphaned_objects)
+
+            # Rows whose object is gone can never be downloaded
+            missing_keys = [key for key in file_keys if key not in bucket_keys]
+            dangling_rows = 0
+            for i in range(0, len(missing_keys), DELETE_OBJECTS_MAX_KEYS):
+                batch = missing_keys[i : i + DELETE_OBJECTS_MAX_KEYS]
+                async with AsyncSessionLocal() as session:
+                    statement = (
+                        delete(File)
+                        .where(col(File.key).in_(batch), File.created_at < cutoff)
+                        .returning(File.key, File.size, File.exhausted_at)
+                    )
+                    result = await session.exec(statement)
+                    deleted = result.all()
+                    await session.commit()
+
+                # Exhausted files were already taken off the quota
+                await free_storage(
+                    redis_client,
+                    sum(
+                        size or 0
+                        for _, size, exhausted_at in deleted
+                        if exhausted_at is None
+                    ),
+                )
+                await invalidate_files(redis_client, *(key for key, _, _ in deleted))
+                dangling_rows += len(deleted)
+
+    logger.info(
+        "Aborted %d multipart uploads (%d bytes), deleted %d orphaned objects "
+        "(%d bytes) and %d rows without an object",
+        aborted_uploads,
+        reclaimed_uploads,
+        len(orphaned_objects),
+        reclaimed_objects,
+        dangling_rows,
+    )
+    return (
+        f"Reclaimed {reclaimed_uploads + reclaimed_objects} bytes from "
+        f"{aborted_uploads} multipart uploads and {len(orphaned_objects)} "
+        f"orphaned objects, removed {dangling_rows} rows without an object."
+    )
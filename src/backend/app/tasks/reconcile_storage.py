@@ -0,0 +1,37 @@
+from sqlmodel import select
+
+from app.celery import celery
+from app.db import AsyncSessionLocal
+from app.deps import get_redis, get_s3_client
+from app.models.files import File
+from app.settings import settings
+from app.storage.quota import live_files_filter, reconcile_storage
+
+
+@celery.task
+async def reconcile_storage_usage():
+    """
+    Correct drift of the running storage counter against the bucket.
+
+    Sums the real object sizes (from paginated ListObjectsV2) of every file
+    that still counts towards the quota and overwrites the counter with it.
+    """
+    async with AsyncSessionLocal() as session:
+        statement = select(File.key).where(live_files_filter())
+        result = await session.exec(statement)
+        live_keys = set(result.all())
+
+    actual = 0
+    async for s3_client in get_s3_client():
+        paginator = s3_client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=settings.RUSTFS_BUCKET_NAME):
+            for obj in page.get("Contents", []):
+                if obj["Key"] in live_keys:
+                    actual += obj["Size"]
+
+    async for redis_client in get_redis():
+        drift = await reconcile_storage(
+            redis_client, actual, settings.STORAGE_RESERVATION_TTL
+        )
+
+    return f"Storage usage reconciled to {actual} bytes (drift {drift})."
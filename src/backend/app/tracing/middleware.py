@@ -0,0 +1,62 @@
+from opentelemetry import context, propagate, trace
+from opentelemetry.trace import SpanKind, StatusCode
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.tracing.provider import get_tracer
+
+
+class TracingMiddleware:
+    """
+    Wrap every request in a server span, continuing the caller's trace.
+
+    The span is current while the request is handled, so database, S3 and
+    Redis spans started by the handler become its children. It is named
+    after the route once routing has picked one.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        tracer = get_tracer()
+        if tracer is None or scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope["headers"]
+        }
+        method = scope.get("method", "WEBSOCKET")
+        span = tracer.start_span(
+            method,
+            kind=SpanKind.SERVER,
+            context=propagate.extract(carrier),
+            attributes={
+                "http.request.method": method,
+                "url.path": scope["path"],
+            },
+        )
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                span.set_attribute("http.response.status_code", status_code)
+                if status_code >= 500:
+                    span.set_status(StatusCode.ERROR)
+            await send(message)
+
+        token = context.attach(trace.set_span_in_context(span))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(StatusCode.ERROR)
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                span.set_attribute("http.route", route.path)
+                span.update_name(f"{method} {route.name}")
+            context.detach(token)
+            span.end()
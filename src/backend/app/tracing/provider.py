@@ -0,0 +1,105 @@
+import logging
+from contextlib import AbstractContextManager, nullcontext
+from typing import TYPE_CHECKING, Any
+
+from opentelemetry.trace import Span, SpanKind, Tracer
+
+from app.settings import settings
+
+if TYPE_CHECKING:
+    # The SDK is optional, only the API is needed while tracing is off
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SpanExporter
+
+logger = logging.getLogger(__name__)
+
+_provider: TracerProvider | None = None
+_tracer: Tracer | None = None
+
+
+def get_tracer() -> Tracer | None:
+    """Return the tracer of this process, None while tracing is off."""
+    return _tracer
+
+
+def configure_tracing(
+    service_name: str,
+    exporter: SpanExporter | None = None,
+    sample_ratio: float | None = None,
+) -> None:
+    """
+    Start recording spans, once per process.
+
+    Spans go to the OTLP endpoint from the settings, or to `exporter` when
+    given, e.g. an in-memory one in tests, which also turns tracing on
+    regardless of TRACING_ENABLED. The provider is kept to this app rather
+    than installed globally.
+    """
+    global _provider, _tracer
+
+    if _provider is not None or (exporter is None and not settings.TRACING_ENABLED):
+        return
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            SimpleSpanProcessor,
+        )
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        logger.warning("Tracing is enabled but opentelemetry-sdk is not installed")
+        return
+
+    if sample_ratio is None:
+        sample_ratio = settings.TRACING_SAMPLE_RATIO
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        # Follow the caller's decision when a request arrives with a trace
+        sampler=ParentBased(TraceIdRatioBased(sample_ratio)),
+    )
+    if exporter is None:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        exporter = OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    else:
+        # Exported as they end, so tests can inspect them right away
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    _provider = provider
+    _tracer = provider.get_tracer("chithi")
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and stop recording."""
+    global _provider, _tracer
+
+    if _provider is not None:
+        provider, _provider, _tracer = _provider, None, None
+        provider.shutdown()
+
+
+def start_span(
+    name: str,
+    kind: SpanKind = SpanKind.INTERNAL,
+    attributes: dict[str, Any] | None = None,
+) -> Span | None:
+    """Start a span that is not made current, the caller ends it."""
+    if _tracer is None:
+        return None
+    return _tracer.start_span(name, kind=kind, attributes=attributes)
+
+
+def span(
+    name: str,
+    kind: SpanKind = SpanKind.INTERNAL,
+    attributes: dict[str, Any] | None = None,
+) -> AbstractContextManager[Span | None]:
+    """Run a block inside a current span, or as is while tracing is off."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, kind=kind, attributes=attributes)
@@ -0,0 +1,47 @@
+from opentelemetry.trace import SpanKind, StatusCode
+from types_aiobotocore_s3 import S3Client
+
+from app.tracing.provider import start_span
+
+_SPAN = "tracing_span"
+
+
+def _before_call(event_name: str, context: dict, **kwargs) -> None:
+    # Events are named like "before-call.s3.GetObject"
+    operation = event_name.rsplit(".", 1)[-1]
+    span = start_span(
+        f"S3 {operation}",
+        kind=SpanKind.CLIENT,
+        attributes={"rpc.system": "aws-api", "rpc.method": operation},
+    )
+    if span is not None:
+        context[_SPAN] = span
+
+
+def _after_call(event_name: str, context: dict, http_response, **kwargs) -> None:
+    span = context.pop(_SPAN, None)
+    if span is None:
+        return
+    span.set_attribute("http.response.status_code", http_response.status_code)
+    if http_response.status_code >= 300:
+        span.set_status(StatusCode.ERROR)
+    span.end()
+
+
+def _after_call_error(
+    event_name: str, context: dict, exception: Exception, **kwargs
+) -> None:
+    span = context.pop(_SPAN, None)
+    if span is None:
+        return
+    span.record_exception(exception)
+    span.set_status(StatusCode.ERROR)
+    span.end()
+
+
+def trace_s3_client(client: S3Client) -> None:
+    """Record a span for every call the client makes, while tracing is on."""
+    events = client.meta.events
+    events.register("before-call.s3", _before_call)
+    events.register("after-call.s3", _after_call)
+    events.register("after-call-error.s3", _after_call_error)
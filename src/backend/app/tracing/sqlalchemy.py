@@ -0,0 +1,59 @@
+from opentelemetry.trace import SpanKind, StatusCode
+from sqlalchemy import event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.tracing.provider import start_span
+
+# Statements longer than this are cut in the span attribute
+MAX_STATEMENT_LENGTH = 2048
+
+
+def _before_cursor_execute(
+    conn, cursor, statement: str, parameters, context, executemany
+) -> None:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement else "SQL"
+    span = start_span(
+        operation,
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system.name": conn.dialect.name,
+            "db.operation.name": operation,
+            "db.query.text": statement[:MAX_STATEMENT_LENGTH],
+        },
+    )
+    if span is not None:
+        context._span = span
+
+
+def _after_cursor_execute(
+    conn, cursor, statement: str, parameters, context, executemany
+) -> None:
+    span = getattr(context, "_span", None)
+    if span is not None:
+        span.end()
+        context._span = None
+
+
+def _handle_error(exception_context: ExceptionContext) -> None:
+    context = exception_context.execution_context
+    span = getattr(context, "_span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.set_status(StatusCode.ERROR)
+        span.end()
+        context._span = None
+
+
+def trace_engine(engine: AsyncEngine) -> None:
+    """
+    Record a span for every statement the engine runs.
+
+    The handlers do nothing while tracing is off. Statements run in the
+    greenlet of the awaiting task, so the spans find the request's span as
+    their parent.
+    """
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
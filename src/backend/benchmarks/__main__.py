@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from enum import StrEnum
+from importlib import import_module
+from pathlib import Path
+
+import typer
+
+from benchmarks.environment import Backends, Environment
+from benchmarks.options import Options
+from benchmarks.results import Result, build_report, compare_reports, write_report
+
+app = typer.Typer(
+    help="Benchmark the upload, download and metadata paths of the backend."
+)
+
+
+class Suite(StrEnum):
+    upload = "upload"
+    download = "download"
+    endpoints = "endpoints"
+    quota = "quota"
+    rate_limit = "rate_limit"
+    cleanup = "cleanup"
+
+
+async def _run_suites(
+    suites: list[Suite], options: Options, fake_redis: bool
+) -> list[Result]:
+    # Imported once the settings point at the benchmark backends
+    from benchmarks.stack import running_stack
+
+    modules = {suite: import_module(f"benchmarks.suites.{suite}") for suite in suites}
+    results = []
+    async with running_stack(fake_redis) as stack:
+        for suite, module in modules.items():
+            typer.echo(f"Running {suite}...", err=True)
+            start = time.perf_counter()
+            results.extend(await module.run(stack, options))
+            typer.echo(f"  done in {time.perf_counter() - start:.1f}s", err=True)
+    return results
+
+
+def _event_loop():
+    try:
+        import uvloop
+    except ImportError:
+        return None, "asyncio"
+    # The loop uvicorn picks in production
+    return uvloop.new_event_loop, "uvloop"
+
+
+@app.command()
+def run(
+    suite: list[Suite] = typer.Option(
+        None, help="Suite to run, may be repeated, all by default"
+    ),
+    output: Path = typer.Option(
+        None, help="Write the JSON report to this file instead of stdout"
+    ),
+    quick: bool = typer.Option(False, help="Smaller sizes and shorter runs"),
+    s3_endpoint: str = typer.Option(
+        None, help="Scratch S3 endpoint to use instead of an in-memory moto server"
+    ),
+    redis_url: str = typer.Option(
+        None, help="Scratch Redis database to use instead of fakeredis, it is flushed"
+    ),
+    postgres: bool = typer.Option(
+        False,
+        help="Use the scratch database from the POSTGRES_* settings instead of a "
+        "temporary SQLite file, its tables are dropped",
+    ),
+):
+    """Run the benchmarks and report every measurement as JSON."""
+    options = Options.quick() if quick else Options()
+    suites = suite or list(Suite)
+    loop_factory, event_loop = _event_loop()
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as workdir:
+        environment = Environment(
+            Backends(s3_endpoint=s3_endpoint, redis_url=redis_url, postgres=postgres),
+            Path(workdir),
+        )
+        backends = environment.start()
+        try:
+            results = asyncio.run(
+                _run_suites(suites, options, fake_redis=redis_url is None),
+                loop_factory=loop_factory,
+            )
+        finally:
+            environment.stop()
+
+    report = build_report(
+        results,
+        environment={
+            **backends,
+            "event_loop": event_loop,
+            "cpu_count": os.cpu_count(),
+        },
+        options={"suites": suites, "quick": quick, **asdict(options)},
+        started_at=started_at,
+        duration=time.perf_counter() - start,
+    )
+    write_report(report, output)
+
+
+@app.command()
+def compare(
+    base: Path = typer.Argument(..., help="Report of the baseline"),
+    new: Path = typer.Argument(..., help="Report to check against it"),
+    threshold: float = typer.Option(
+        0.1, help="Relative change in the wrong direction that fails the check"
+    ),
+):
+    """Show how every metric moved between two reports, fail on regressions."""
+    changes = compare_reports(json.loads(base.read_text()), json.loads(new.read_text()))
+    regressions = 0
+    for change in changes:
+        marker = ""
+        if change.regression and abs(change.ratio) > threshold:
+            marker = "  REGRESSION"
+            regressions += 1
+        typer.echo(
+            f"{change.suite:<10} {change.case:<28} {change.metric:<18} "
+            f"{change.base:>12.3f} {change.new:>12.3f} {change.ratio:>+8.1%}{marker}"
+        )
+
+    if regressions:
+        typer.echo(f"{regressions} regressions over {threshold:.0%}", err=True)
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
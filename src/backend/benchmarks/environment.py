@@ -0,0 +1,85 @@
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.settings import settings
+
+
+@dataclass
+class Backends:
+    # Real services to use instead of the in-process stand-ins. Each must be
+    # a scratch instance, the benchmarks empty it.
+    s3_endpoint: str | None = None
+    redis_url: str | None = None
+    # Use the POSTGRES_* settings instead of a temporary SQLite file
+    postgres: bool = False
+
+
+class Environment:
+    """
+    Point the settings at the services the benchmarks run against.
+
+    Has to run before the rest of the app is imported, the database engine
+    and the rate limits are set up from the settings at import time.
+    """
+
+    def __init__(self, backends: Backends, workdir: Path):
+        self.backends = backends
+        self.workdir = workdir
+        self._moto_server = None
+
+    def start(self) -> dict[str, Any]:
+        """Start the stand-ins and return a description of the backends."""
+        if self.backends.s3_endpoint:
+            settings.RUSTFS_ENDPOINT_URL = self.backends.s3_endpoint
+            s3 = "external"
+        else:
+            try:
+                from moto.server import ThreadedMotoServer
+            except ImportError:
+                raise RuntimeError(
+                    "moto is needed for the in-memory S3, install the bench "
+                    "dependency group or pass --s3-endpoint"
+                )
+            self._moto_server = ThreadedMotoServer(
+                ip_address="127.0.0.1", port=0, verbose=False
+            )
+            # Its access log would interleave with the progress output
+            logging.getLogger("werkzeug").setLevel(logging.WARNING)
+            self._moto_server.start()
+            host, port = self._moto_server.get_host_and_port()
+            settings.RUSTFS_ENDPOINT_URL = f"http://{host}:{port}"
+            s3 = "moto"
+        settings.RUSTFS_PUBLIC_ENDPOINT_URL = None
+
+        if self.backends.redis_url:
+            settings.REDIS_ENDPOINT = self.backends.redis_url
+            redis = "external"
+        else:
+            redis = "fakeredis"
+
+        if self.backends.postgres:
+            settings.USE_SQLITE = False
+            database = "postgresql"
+        else:
+            settings.USE_SQLITE = True
+            # The URL is relative to the working directory
+            settings.SQLITE_DB = os.path.relpath(self.workdir / "benchmark.db")
+            database = "sqlite"
+
+        # Measure the app itself, not limits from a local .env
+        settings.DOWNLOAD_MODE = "stream"
+        settings.UPLOAD_BANDWIDTH_LIMIT = None
+        settings.DOWNLOAD_BANDWIDTH_LIMIT = None
+        settings.UPLOAD_BANDWIDTH_GLOBAL_LIMIT = None
+        settings.DOWNLOAD_BANDWIDTH_GLOBAL_LIMIT = None
+        settings.TRACING_ENABLED = False
+
+        return {"s3": s3, "redis": redis, "database": database}
+
+    def stop(self) -> None:
+        if self._moto_server is not None:
+            self._moto_server.stop()
+            self._moto_server = None
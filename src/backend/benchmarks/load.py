@@ -0,0 +1,66 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+
+@dataclass
+class LoadRun:
+    elapsed: float = 0.0
+    # Durations of the calls that succeeded, in seconds
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    @property
+    def calls(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def calls_per_second(self) -> float:
+        return self.calls / self.elapsed if self.elapsed else 0.0
+
+
+async def closed_loop(
+    call: Callable[[int], Awaitable[object]],
+    concurrency: int,
+    *,
+    calls: int | None = None,
+    duration: float | None = None,
+) -> LoadRun:
+    """
+    Keep `concurrency` calls in flight until `calls` were made or `duration`
+    seconds passed.
+
+    Each worker starts its next call as soon as the previous one returns, so
+    the rate measured is what the server sustains at that concurrency. The
+    call gets a sequence number, an exception counts as an error.
+    """
+    if (calls is None) == (duration is None):
+        raise ValueError("Pass either calls or duration")
+
+    run = LoadRun()
+    next_call = 0
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+
+    async def worker():
+        nonlocal next_call
+        while True:
+            if calls is not None and next_call >= calls:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            sequence = next_call
+            next_call += 1
+
+            call_start = time.perf_counter()
+            try:
+                await call(sequence)
+            except Exception:
+                run.errors += 1
+            else:
+                run.latencies.append(time.perf_counter() - call_start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    run.elapsed = time.perf_counter() - start
+    return run
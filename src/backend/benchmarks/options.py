@@ -0,0 +1,42 @@
+from dataclasses import dataclass, field
+
+from app.converter.bytes import ByteSize
+
+
+@dataclass
+class Options:
+    # Files uploaded and downloaded, each at every concurrency
+    file_sizes: list[int] = field(
+        default_factory=lambda: [
+            ByteSize(mb=1).total_bytes(),
+            ByteSize(mb=16).total_bytes(),
+            ByteSize(mb=64).total_bytes(),
+        ]
+    )
+    concurrency: list[int] = field(default_factory=lambda: [1, 4, 16])
+    # Bytes moved per size and concurrency, at least two files per client
+    bytes_per_case: int = ByteSize(mb=256).total_bytes()
+
+    # Seconds each metadata endpoint is called for, by how many clients
+    duration: float = 5.0
+    request_concurrency: int = 32
+
+    # Files counting towards the quota when its check is timed
+    live_files: list[int] = field(default_factory=lambda: [0, 1_000, 10_000, 100_000])
+    # Expired files removed by one sweep
+    cleanup_files: int = 5_000
+    # Calls timed for the quota and rate limiter
+    iterations: int = 2_000
+
+    @classmethod
+    def quick(cls) -> "Options":
+        """A smaller run that finishes in about a minute, e.g. for CI."""
+        return cls(
+            file_sizes=[ByteSize(mb=1).total_bytes(), ByteSize(mb=16).total_bytes()],
+            concurrency=[1, 4],
+            bytes_per_case=ByteSize(mb=32).total_bytes(),
+            duration=1.0,
+            live_files=[0, 1_000, 10_000],
+            cleanup_files=1_000,
+            iterations=500,
+        )
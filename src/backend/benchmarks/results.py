@@ -0,0 +1,151 @@
+import json
+import math
+import platform
+import subprocess
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Sequence
+
+from app.converter.bytes import ByteSize
+
+# Bumped when the layout of the report changes
+REPORT_VERSION = 1
+
+MB = ByteSize(mb=1).total_bytes()
+
+
+@dataclass
+class Result:
+    """One measured case of a suite, e.g. uploads of 16MB files, 4 at once."""
+
+    suite: str
+    case: str
+    params: dict[str, Any] = field(default_factory=dict)
+    metrics: dict[str, float] = field(default_factory=dict)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Linearly interpolated percentile, `q` between 0 and 100."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_metrics(
+    prefix: str, seconds: Sequence[float], unit: str = "ms"
+) -> dict[str, float]:
+    """p50, p99 and max of durations in seconds, converted to `unit`."""
+    scale = {"ms": 1e3, "us": 1e6}[unit]
+    return {
+        f"{prefix}_p50_{unit}": percentile(seconds, 50) * scale,
+        f"{prefix}_p99_{unit}": percentile(seconds, 99) * scale,
+        f"{prefix}_max_{unit}": max(seconds, default=math.nan) * scale,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def build_report(
+    results: list[Result],
+    environment: dict[str, Any],
+    options: dict[str, Any],
+    started_at: str,
+    duration: float,
+) -> dict[str, Any]:
+    return {
+        "version": REPORT_VERSION,
+        "started_at": started_at,
+        "duration_s": duration,
+        "environment": {
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            **environment,
+        },
+        "options": options,
+        "results": [asdict(result) for result in results],
+    }
+
+
+def write_report(report: dict[str, Any], output: Path | None) -> None:
+    # NaN is not valid JSON, missing measurements are written as null
+    text = json.dumps(_without_nan(report), indent=2) + "\n"
+    if output is None:
+        print(text, end="")
+    else:
+        output.write_text(text)
+
+
+def _without_nan(value: Any) -> Any:
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _without_nan(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_without_nan(item) for item in value]
+    return value
+
+
+def lower_is_better(metric: str) -> bool | None:
+    """Which way a metric should move, None for the ones that are not compared."""
+    if metric.endswith("_per_s"):
+        return False
+    if metric.endswith(("_ms", "_us", "_s")) or metric == "errors":
+        return True
+    return None
+
+
+@dataclass
+class Change:
+    suite: str
+    case: str
+    metric: str
+    base: float
+    new: float
+
+    @property
+    def ratio(self) -> float:
+        if self.base == 0:
+            return 0.0 if self.new == 0 else math.inf
+        return (self.new - self.base) / self.base
+
+    @property
+    def regression(self) -> bool:
+        return self.ratio > 0 if lower_is_better(self.metric) else self.ratio < 0
+
+
+def compare_reports(base: dict[str, Any], new: dict[str, Any]) -> list[Change]:
+    """Pair up the metrics both reports measured for the same suite and case."""
+    base_metrics = {
+        (result["suite"], result["case"]): result["metrics"]
+        for result in base["results"]
+    }
+    changes = []
+    for result in new["results"]:
+        previous = base_metrics.get((result["suite"], result["case"]))
+        if previous is None:
+            continue
+        for metric, value in result["metrics"].items():
+            base_value = previous.get(metric)
+            if lower_is_better(metric) is None or value is None or base_value is None:
+                continue
+            changes.append(
+                Change(result["suite"], result["case"], metric, base_value, value)
+            )
+    return changes
@@ -0,0 +1,189 @@
+import asyncio
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+import aiohttp
+import uvicorn
+from redis.asyncio import Redis
+from sqlalchemy import insert
+from sqlmodel import SQLModel, delete
+from types_aiobotocore_s3 import S3Client
+
+from app import db
+from app.cache import client as cache_client
+from app.main import app
+from app.models.config import Config
+from app.models.files import File
+from app.settings import settings
+from app.storage.client import open_s3_client
+
+# Rows inserted per statement when seeding the files table
+INSERT_BATCH_SIZE = 5_000
+
+# Large enough for every benchmarked file, still exercising the limit checks
+STORAGE_LIMIT = 1 << 50
+MAX_FILE_SIZE = 1 << 40
+
+BOUNDARY = "chithi-benchmark-boundary"
+
+
+@dataclass
+class Stack:
+    """The app served over HTTP, and the services behind it."""
+
+    base_url: str
+    http: aiohttp.ClientSession
+    s3: S3Client
+    redis: Redis
+
+    async def reset(self) -> None:
+        """Remove every file, object and Redis key a benchmark left behind."""
+        async with db.AsyncSessionLocal() as session:
+            await session.exec(delete(File))
+            await session.commit()
+
+        paginator = self.s3.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=settings.RUSTFS_BUCKET_NAME):
+            objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if objects:
+                await self.s3.delete_objects(
+                    Bucket=settings.RUSTFS_BUCKET_NAME,
+                    Delete={"Objects": objects, "Quiet": True},
+                )
+
+        await self.redis.flushdb()
+
+    async def upload(self, body: bytes) -> str:
+        """Upload a body built by `multipart_body` and return the file key."""
+        async with self.http.post(
+            "/upload",
+            data=body,
+            headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+        ) as response:
+            response.raise_for_status()
+            return (await response.json())["key"]
+
+
+def multipart_body(
+    data: bytes,
+    expire_after_n_download: int = 1_000_000,
+    expire_after: int = int(timedelta(days=1).total_seconds()),
+) -> bytes:
+    """The form the upload endpoint expects, with the fields ahead of the file."""
+    fields = {
+        "expire_after_n_download": str(expire_after_n_download),
+        "expire_after": str(expire_after),
+    }
+    head = b"".join(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+        f"{value}\r\n".encode()
+        for name, value in fields.items()
+    )
+    file_head = (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="benchmark.bin"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    return head + file_head + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def insert_files(
+    count: int,
+    size: int,
+    expires_at: datetime,
+    expire_after_n_download: int = 1_000_000,
+) -> list[str]:
+    """Add `count` file rows straight to the database and return their keys."""
+    now = datetime.now(timezone.utc)
+    created_at = min(now, expires_at)
+    keys = []
+    async with db.engine.begin() as connection:
+        for start in range(0, count, INSERT_BATCH_SIZE):
+            rows = []
+            for _ in range(min(INSERT_BATCH_SIZE, count - start)):
+                key = str(uuid.uuid7())
+                keys.append(key)
+                rows.append(
+                    {
+                        "id": uuid.uuid7(),
+                        "key": key,
+                        "filename": "benchmark.bin",
+                        "size": size,
+                        "download_count": 0,
+                        "expire_after_n_download": expire_after_n_download,
+                        "created_at": created_at,
+                        "expires_at": expires_at,
+                    }
+                )
+            await connection.execute(insert(File), rows)
+    return keys
+
+
+async def _create_schema() -> None:
+    async with db.engine.begin() as connection:
+        # A scratch database may hold tables of an earlier run
+        await connection.run_sync(SQLModel.metadata.drop_all)
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    async with db.AsyncSessionLocal() as session:
+        session.add(
+            Config(
+                total_storage_limit=STORAGE_LIMIT,
+                max_file_size_limit=MAX_FILE_SIZE,
+            )
+        )
+        await session.commit()
+
+
+@asynccontextmanager
+async def running_stack(fake_redis: bool) -> AsyncIterator[Stack]:
+    """
+    Serve the app with uvicorn on a local port, in this event loop.
+
+    Client and server share the loop and the CPU, so the numbers are meant
+    for comparing runs of the same machine against each other.
+    """
+    await _create_schema()
+    if fake_redis:
+        from fakeredis.aioredis import FakeRedis
+
+        # Picked up by get_redis_client() in place of a real connection
+        cache_client._client = FakeRedis(decode_responses=True)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    host, port = sock.getsockname()
+    server = uvicorn.Server(
+        uvicorn.Config(app, log_level="warning", access_log=False, lifespan="on")
+    )
+    serving = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        if serving.done():
+            # Startup failed, raise its error
+            await serving
+        await asyncio.sleep(0.01)
+
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=None)
+    try:
+        async with aiohttp.ClientSession(
+            f"http://{host}:{port}", connector=connector, timeout=timeout
+        ) as http:
+            stack = Stack(
+                base_url=f"http://{host}:{port}",
+                http=http,
+                s3=await open_s3_client(),
+                redis=cache_client.get_redis_client(),
+            )
+            await stack.redis.flushdb()
+            yield stack
+            await stack.reset()
+    finally:
+        server.should_exit = True
+        await serving
+        sock.close()
+        await db.engine.dispose()
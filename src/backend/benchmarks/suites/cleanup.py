@@ -0,0 +1,56 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import func, select
+
+from app import db
+from app.models.files import File
+from app.settings import settings
+from app.tasks.clean_file import sweep_expired_files
+from benchmarks.options import Options
+from benchmarks.results import Result
+from benchmarks.stack import Stack, insert_files
+
+# Objects created at once while setting up the sweep
+PUT_CONCURRENCY = 32
+
+
+async def run(stack: Stack, options: Options) -> list[Result]:
+    """Throughput of the sweeper removing expired files from S3 and the database."""
+    count = options.cleanup_files
+    expired_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    keys = await insert_files(count, 1024, expired_at)
+
+    slots = asyncio.Semaphore(PUT_CONCURRENCY)
+
+    async def put(key: str):
+        async with slots:
+            await stack.s3.put_object(
+                Bucket=settings.RUSTFS_BUCKET_NAME, Key=key, Body=b"x" * 1024
+            )
+
+    await asyncio.gather(*(put(key) for key in keys))
+
+    start = time.perf_counter()
+    # The task body, run in this process instead of through a worker
+    await sweep_expired_files()
+    elapsed = time.perf_counter() - start
+
+    async with db.AsyncSessionLocal() as session:
+        remaining = (await session.exec(select(func.count()).select_from(File))).one()
+    await stack.reset()
+
+    return [
+        Result(
+            suite="cleanup",
+            case=f"files={count}",
+            params={"files": count, "batch_size": settings.FILE_SWEEP_BATCH_SIZE},
+            metrics={
+                "files_per_s": (count - remaining) / elapsed,
+                "sweep_s": elapsed,
+                # Files the sweep left behind
+                "errors": remaining,
+            },
+        )
+    ]
@@ -0,0 +1,55 @@
+import math
+import os
+import time
+
+from benchmarks.load import closed_loop
+from benchmarks.options import Options
+from benchmarks.results import MB, Result, latency_metrics
+from benchmarks.stack import Stack, multipart_body
+
+READ_SIZE = 1 << 20
+
+
+async def run(stack: Stack, options: Options) -> list[Result]:
+    """
+    Download throughput and time to first byte of `GET /download/{key}`.
+
+    Every download claims a slot and streams the object from S3 through the
+    app, the usual path for a link opened in a browser.
+    """
+    results = []
+    for size in options.file_sizes:
+        key = await stack.upload(multipart_body(os.urandom(size)))
+        for concurrency in options.concurrency:
+            downloads = max(2 * concurrency, math.ceil(options.bytes_per_case / size))
+            first_byte: list[float] = []
+
+            async def download(_: int):
+                start = time.perf_counter()
+                async with stack.http.get(f"/download/{key}") as response:
+                    response.raise_for_status()
+                    received = len(await response.content.readany())
+                    first_byte.append(time.perf_counter() - start)
+                    while chunk := await response.content.read(READ_SIZE):
+                        received += len(chunk)
+                if received != size:
+                    raise ValueError(f"Received {received} of {size} bytes")
+
+            run = await closed_loop(download, concurrency, calls=downloads)
+
+            results.append(
+                Result(
+                    suite="download",
+                    case=f"size={size},concurrency={concurrency}",
+                    params={"size": size, "concurrency": concurrency},
+                    metrics={
+                        "mb_per_s": run.calls * size / MB / run.elapsed,
+                        "downloads": run.calls,
+                        "errors": run.errors,
+                        **latency_metrics("ttfb", first_byte),
+                        **latency_metrics("latency", run.latencies),
+                    },
+                )
+            )
+        await stack.reset()
+    return results
@@ -0,0 +1,42 @@
+from benchmarks.load import closed_loop
+from benchmarks.options import Options
+from benchmarks.results import Result, latency_metrics
+from benchmarks.stack import Stack, multipart_body
+
+
+async def run(stack: Stack, options: Options) -> list[Result]:
+    """Requests per second of the metadata endpoints every page load calls."""
+    key = await stack.upload(multipart_body(b"benchmark"))
+    endpoints = {
+        "information": f"/information/{key}",
+        "config": "/config",
+    }
+
+    results = []
+    for name, path in endpoints.items():
+
+        async def call(_: int):
+            async with stack.http.get(path) as response:
+                response.raise_for_status()
+                await response.read()
+
+        # The first call fills the caches, as on a running server
+        await call(0)
+        run = await closed_loop(
+            call, options.request_concurrency, duration=options.duration
+        )
+        results.append(
+            Result(
+                suite="endpoints",
+                case=name,
+                params={"path": path, "concurrency": options.request_concurrency},
+                metrics={
+                    "requests_per_s": run.calls_per_second,
+                    "requests": run.calls,
+                    "errors": run.errors,
+                    **latency_metrics("latency", run.latencies),
+                },
+            )
+        )
+    await stack.reset()
+    return results
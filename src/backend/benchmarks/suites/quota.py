@@ -0,0 +1,59 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from app import db
+from app.storage.quota import compute_storage_used, get_storage_used, reserve_storage
+from benchmarks.options import Options
+from benchmarks.results import Result, latency_metrics
+from benchmarks.stack import STORAGE_LIMIT, Stack, insert_files
+
+# Times the counter is seeded from the database per number of files
+SEED_REPEATS = 5
+
+
+async def run(stack: Stack, options: Options) -> list[Result]:
+    """
+    Cost of the storage quota check by the number of live files.
+
+    Uploads reserve bytes against a Redis counter, which should cost the same
+    however many files exist. Seeding that counter sums the files table, which
+    happens after Redis lost it and grows with the number of files.
+    """
+    results = []
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+    inserted = 0
+    for live_files in sorted(options.live_files):
+        await insert_files(live_files - inserted, 1024, expires_at)
+        inserted = live_files
+
+        seed = []
+        async with db.AsyncSessionLocal() as session:
+            for _ in range(SEED_REPEATS):
+                start = time.perf_counter()
+                await compute_storage_used(session)
+                seed.append(time.perf_counter() - start)
+
+            # Seeded once, as it is on a running server
+            await get_storage_used(stack.redis, session)
+            reserve = []
+            for iteration in range(options.iterations):
+                start = time.perf_counter()
+                await reserve_storage(
+                    stack.redis, session, f"benchmark-{iteration}", 1, STORAGE_LIMIT
+                )
+                reserve.append(time.perf_counter() - start)
+        await stack.redis.flushdb()
+
+        results.append(
+            Result(
+                suite="quota",
+                case=f"live_files={live_files}",
+                params={"live_files": live_files},
+                metrics={
+                    **latency_metrics("seed", seed),
+                    **latency_metrics("reserve", reserve, unit="us"),
+                },
+            )
+        )
+    await stack.reset()
+    return results
@@ -0,0 +1,81 @@
+import time
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.decorators.rate_limit import rate_limit
+from app.guards.rate_limit import rate_limiter_guard, resolve_rate_limits
+from app.main import app
+from benchmarks.options import Options
+from benchmarks.results import Result, latency_metrics
+from benchmarks.stack import Stack
+
+
+def unlimited():
+    pass
+
+
+@rate_limit("1000000req/sec")
+def allowed():
+    pass
+
+
+@rate_limit("1req/min")
+def blocked():
+    pass
+
+
+def _request(endpoint, client: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [],
+            "client": (client, 0),
+            "endpoint": endpoint,
+        }
+    )
+
+
+async def _time_guard(endpoint, iterations: int) -> list[float]:
+    request = _request(endpoint, "192.0.2.1")
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            await rate_limiter_guard(request)
+        except HTTPException:
+            pass
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def run(stack: Stack, options: Options) -> list[Result]:
+    """
+    Time the rate limiter guard every request passes through.
+
+    Endpoints without limits return before Redis is involved, limited ones
+    run the GCRA script, clients already over a limit are turned away from
+    the per-process cache.
+    """
+    resolve_rate_limits(
+        SimpleNamespace(endpoint=endpoint) for endpoint in (allowed, blocked)
+    )
+    try:
+        results = []
+        for endpoint in (unlimited, allowed, blocked):
+            durations = await _time_guard(endpoint, options.iterations)
+            results.append(
+                Result(
+                    suite="rate_limit",
+                    case=endpoint.__name__,
+                    params={"rates": getattr(endpoint, "_rate_limits", [])},
+                    metrics=latency_metrics("guard", durations, unit="us"),
+                )
+            )
+    finally:
+        resolve_rate_limits(app.routes)
+        await stack.redis.flushdb()
+    return results
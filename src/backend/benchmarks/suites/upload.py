@@ -0,0 +1,37 @@
+import math
+import os
+
+from benchmarks.load import closed_loop
+from benchmarks.options import Options
+from benchmarks.results import MB, Result, latency_metrics
+from benchmarks.stack import Stack, multipart_body
+
+
+async def run(stack: Stack, options: Options) -> list[Result]:
+    """Upload throughput through `POST /upload` by file size and concurrency."""
+    results = []
+    for size in options.file_sizes:
+        body = multipart_body(os.urandom(size))
+        for concurrency in options.concurrency:
+            uploads = max(2 * concurrency, math.ceil(options.bytes_per_case / size))
+
+            async def upload(_: int):
+                await stack.upload(body)
+
+            run = await closed_loop(upload, concurrency, calls=uploads)
+            await stack.reset()
+
+            results.append(
+                Result(
+                    suite="upload",
+                    case=f"size={size},concurrency={concurrency}",
+                    params={"size": size, "concurrency": concurrency},
+                    metrics={
+                        "mb_per_s": run.calls * size / MB / run.elapsed,
+                        "uploads": run.calls,
+                        "errors": run.errors,
+                        **latency_metrics("latency", run.latencies),
+                    },
+                )
+            )
+    return results
@@ -9,4 +9,5 @@ else
 fi
 
 export CELERY_CUSTOM_WORKER_POOL='celery_aio_pool.pool:AsyncIOPool'
-exec celery -A app.celery worker --pool=custom --concurrency "$CONCURRENCY" --loglevel=info --max-memory-per-child=131072
\ No newline at end of file
+# --beat runs the periodic tasks (expiry sweeper, reconciliation) in this worker
+exec celery -A app.celery worker --beat --pool=custom --concurrency "$CONCURRENCY" --loglevel=info --max-memory-per-child=131072
\ No newline at end of file
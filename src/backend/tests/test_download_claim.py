@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db import _set_sqlite_pragmas
+from app.models.files import File
+from app.routes.download import _claim_download
+
+DOWNLOAD_LIMIT = 10
+CONCURRENT_CLAIMS = 100
+
+
+async def _claim_concurrently(database: Path) -> tuple[list[File | None], File]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database}")
+    # Same connection setup as the app, concurrent writers wait on each other
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+
+        now = datetime.now(timezone.utc)
+        async with AsyncSession(engine) as session:
+            session.add(
+                File(
+                    key="claimed",
+                    filename="claimed.bin",
+                    expires_at=now + timedelta(days=1),
+                    expire_after_n_download=DOWNLOAD_LIMIT,
+                    created_at=now,
+                    size=1024,
+                )
+            )
+            await session.commit()
+
+        async def claim() -> File | None:
+            # One session per download, as every request gets its own
+            async with AsyncSession(engine) as session:
+                return await _claim_download(session, "claimed")
+
+        claims = await asyncio.gather(*(claim() for _ in range(CONCURRENT_CLAIMS)))
+
+        async with AsyncSession(engine) as session:
+            result = await session.exec(select(File).where(File.key == "claimed"))
+            return claims, result.one()
+    finally:
+        await engine.dispose()
+
+
+def test_concurrent_claims_stop_at_download_limit(tmp_path: Path):
+    claims, file_object = asyncio.run(_claim_concurrently(tmp_path / "claims.db"))
+
+    assert sum(claim is not None for claim in claims) == DOWNLOAD_LIMIT
+    assert file_object.download_count == DOWNLOAD_LIMIT
+    assert file_object.exhausted_at is not None
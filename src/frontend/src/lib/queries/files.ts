@@ -1,5 +1,5 @@
 import { ADMIN_FILES_URL } from '#consts/backend';
-import { createQuery, useQueryClient } from '@tanstack/svelte-query';
+import { createInfiniteQuery, type InfiniteData, useQueryClient } from '@tanstack/svelte-query';
 
 export type FileInfo = {
 	id: string;
@@ -12,17 +12,27 @@ export type FileInfo = {
 	download_count?: number;
 };
 
+type FilesPage = {
+	files: FileInfo[];
+	// Pass as `cursor` for the next page, null on the last one
+	nextCursor: string | null;
+};
+
 export const useFilesQuery = () => {
 	const queryClient = useQueryClient();
-	const query = createQuery(() => ({
+	// The backend returns one page per request, more are loaded on demand
+	const query = createInfiniteQuery(() => ({
 		queryKey: ['admin-files'],
-		queryFn: async () => {
+		queryFn: async ({ pageParam }: { pageParam: string | null }): Promise<FilesPage> => {
 			const token = localStorage.getItem('auth_token');
 			if (!token) {
 				throw new Error('Not authenticated');
 			}
 
-			const res = await fetch(ADMIN_FILES_URL, {
+			const url = pageParam
+				? `${ADMIN_FILES_URL}?cursor=${encodeURIComponent(pageParam)}`
+				: ADMIN_FILES_URL;
+			const res = await fetch(url, {
 				headers: {
 					Authorization: `Bearer ${token}`
 				}
@@ -34,8 +44,15 @@ export const useFilesQuery = () => {
 				}
 				throw new Error(`Failed to fetch files: ${res.statusText}`);
 			}
-			return res.json() as Promise<FileInfo[]>;
+			return {
+				files: (await res.json()) as FileInfo[],
+				nextCursor: res.headers.get('X-Next-Cursor')
+			};
 		},
+		initialPageParam: null as string | null,
+		getNextPageParam: (lastPage: FilesPage) => lastPage.nextCursor,
+		select: (data: InfiniteData<FilesPage, string | null>) =>
+			data.pages.flatMap((page) => page.files),
 		refetchInterval: 1000, // 1 second
 		retry: true
 	}));